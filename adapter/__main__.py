@@ -29,26 +29,51 @@ Dataflow Schematic:
 
 """
 
+from commandport import CommandPort
+from eventloop import EventLoop, Channel
+from seqrouter import SeqRouter, ANSWERED
+from stats import MessageStats
+from framing import MessageFramer, frame_message, peek
 from interface import DebuggerInterface
-from tempfile import gettempdir
+from tempfile import mkstemp
+from base64 import b64encode
 from queue import Queue
 from util import *
 import socket
+import atexit
 import json
+import time
+import sys
 import os
 
 
 # Globals
 interface = None
 
-processed_seqs = []
+# Where each request from the debugger went, to route debugpy's responses
+seq_router = SeqRouter()
 
-maya_cmd_socket = socket.socket()
+# Latency and size of the messages going through the adapter
+message_stats = MessageStats()
+
+# The only requests from the debugger that need to be looked at, everything
+# else is forwarded to debugpy as the raw bytes that were received
+INTERCEPTED_COMMANDS = ('initialize', 'attach')
+
+maya_cmd_port = None
 run_code = ""
 
+# Seconds to wait for Maya to confirm it ran the attach code
+ATTACH_REPLY_TIMEOUT = 10
+
 debugpy_send_queue = Queue()
 debugpy_socket = None
 
+# Only set when running with --event-loop, which handles stdin, stdout, the
+# commandPort and debugpy sockets on one thread instead of one thread each
+event_loop = None
+debugpy_channel = None
+
 
 def main():
     """
@@ -56,12 +81,22 @@ def main():
     reading messages from debugger.
     """
     
-    global interface
+    global interface, event_loop, debugpy_channel
 
-    # Create and start the interface with the debugger
-    interface = DebuggerInterface(on_receive=on_receive_from_debugger)
+    if '--event-loop' in sys.argv and EventLoop.is_supported():
+        event_loop = EventLoop()
+        debugpy_channel = Channel('debugpy', on_receive=on_receive_from_debugpy)
+
+    # Keep the statistics even if the session ends without a disconnect response
+    atexit.register(write_stats)
+
+    # Create and start the interface with the debugger, which returns
+    # once the debugger closed stdin
+    interface = DebuggerInterface(on_receive=on_receive_from_debugger, loop=event_loop)
     interface.start()
 
+    write_stats()
+
 
 def on_receive_from_debugger(message):
     """
@@ -69,25 +104,51 @@ def on_receive_from_debugger(message):
     while debugpy is being set up
     """
 
-    # Load message contents into a dictionary
-    contents = json.loads(message)
-
-    log('Received from Debugger:', message)
+    log('Received from Debugger:', message, level=DEBUG)
 
     # Get the type of command the debugger sent
+    cmd = peek(message, 'command')
+    seq = peek(message, 'seq')
+    is_request = peek(message, 'type') == 'request'
+
+    if is_request and cmd == 'mayaStats':
+        # Custom request answered by the adapter itself
+        body = json.dumps(message_stats.snapshot())
+        interface.send(json.dumps(json.loads(STATS_RESPONSE.format(request_seq=seq, body=body))))
+        return
+
+    if is_request:
+        # Responses to debugpy's own requests (like runInTerminal) aren't
+        # answered by anything, they must not be waited for
+        message_stats.request(cmd, len(message))
+
+        if cmd == 'initialize':
+            # Answered below, debugpy's own response will be dropped
+            seq_router.answered(seq, cmd)
+        else:
+            seq_router.forwarded(seq, cmd)
+
+    if cmd not in INTERCEPTED_COMMANDS:
+        # Nothing to change, pass it through untouched
+        send_to_debugpy(message)
+        return
+
+    # Load message contents into a dictionary
+    contents = json.loads(message)
     cmd = contents['command']
-    
+
     if cmd == 'initialize':
         # Run init request once maya connection is established and send success response to the debugger
         interface.send(json.dumps(json.loads(INITIALIZE_RESPONSE)))  # load and dump to remove indents
-        processed_seqs.append(contents['seq'])
     
     elif cmd == 'attach':
+        config = contents['arguments']
+        set_log_level(config.get('log_level'))
+
         # time to attach to maya
         run_in_new_thread(attach_to_maya, (contents,))
 
         # Change arguments to valid ones for debugpy
-        config = contents['arguments']
         new_args = ATTACH_ARGS.format(
             dir=dirname(config['program']).replace('\\', '\\\\'),
             hostname=config['debugpy']['host'],
@@ -100,43 +161,58 @@ def on_receive_from_debugger(message):
         contents['arguments'] = json.loads(new_args)
         message = json.dumps(contents)  # update contents to reflect new args
 
-        log("New attach arguments loaded:", new_args)
+        log("New attach arguments loaded:", new_args, level=DEBUG)
 
     # Then just put the message in the maya debugging queue
-    debugpy_send_queue.put(message)
+    send_to_debugpy(message)
+
+
+def send_to_debugpy(message):
+    """
+    Queues a message for debugpy, it is sent as soon as the connection is up
+    """
+
+    if debugpy_channel:
+        debugpy_channel.send(message)
+        log('Sent to debugpy:', message, level=DEBUG)
+    else:
+        debugpy_send_queue.put(message)
 
 
 def attach_to_maya(contents):
     """
     Defines commands to send to Maya, establishes a connection to its commandPort,
-    then sends the code to inject debugpy
+    then sends the code to inject debugpy unless it is already listening in Maya
     """
 
-    global run_code
+    global run_code, maya_cmd_port
+    attach_started = time.time()
     config = contents['arguments']
 
     # Format the simulated attach response to send it back to the debugger
     # while we set up the debugpy in the background
     attach_code = ATTACH_TEMPLATE.format(
         debugpy_path=debugpy_path,
+        interpreter=repr(config['interpreter']) if 'interpreter' in config else 'sys.executable',
         hostname=config['debugpy']['host'],
         port=int(config['debugpy']['port'])
     )
 
-    # Format RUN_TEMPLATE to point to the temporary
+    # Format the run template to point to the temporary
     # file containing the code to run
-    run_code = RUN_TEMPLATE.format(
+    run_template = RELOAD_TEMPLATE if config.get('reload') == 'changed' else RUN_TEMPLATE
+    run_code = run_template.format(
         dir=dirname(config['program']),
         file_name=split(config['program'])[1][:-3] or basename(split(config['program'])[0])[:-3]
     )
 
-    log("RUN: \n" + run_code)
+    log("RUN: \n" + run_code, level=DEBUG)
 
     # Connect to given host/port combo
     maya_host, maya_port = config['maya']['host'], int(config['maya']['port'])
     try:
-        maya_cmd_socket.settimeout(3)
-        maya_cmd_socket.connect((maya_host, maya_port))
+        maya_cmd_port = CommandPort(maya_host, maya_port, event_loop)
+        maya_cmd_port.connect()
     except:
         # Raising exceptions shows the text in the Debugger's output.
         # Raise an error to show a potential solution to this problem.
@@ -151,37 +227,96 @@ def attach_to_maya(contents):
             """.format(host=maya_host, port=maya_port)
         )
 
-    # then send attach code
-    log('Sending attach code to Maya')
-    send_code_to_maya(attach_code)
-    log('Successfully attached to Maya')
+    debugpy_address = (config['debugpy']['host'], int(config['debugpy']['port']))
+
+    # A previous session may have left debugpy listening in this Maya
+    listening_address = query_debugpy_address()
+
+    if listening_address:
+        log('debugpy is already listening in Maya on {}:{}, skipping injection'.format(*listening_address))
+        debugpy_address = (debugpy_address[0], listening_address[1])
+        reused = True
+    else:
+        # then send attach code
+        log('Sending attach code to Maya')
+        reply = send_code_to_maya(attach_code)
+        if not reply.wait(ATTACH_REPLY_TIMEOUT):
+            log('Maya has not confirmed the attach code was run yet, connecting anyway', level=WARNING)
+        elif reply.error:
+            log('Failed to send attach code to Maya: ' + str(reply.error), level=ERROR)
+        else:
+            log('Successfully attached to Maya')
+        reused = False
 
     # Then start the maya debugging threads
-    run_in_new_thread(start_debugging, ((config['debugpy']['host'], int(config['debugpy']['port'])),))
+    run_in_new_thread(start_debugging, (debugpy_address, attach_started, reused))
 
 
-def send_code_to_maya(code):
+def query_debugpy_address():
     """
-    Wraps the code string in a mel command, then sends it to Maya
+    Asks Maya for the address debugpy was set up to listen on by a previous session.
+    Returns a (host, port) tuple, or None if it was never set up.
     """
 
-    # Create a temporary file, keeping its path, and
-    # populate it with the given code to run
-    filepath = join(gettempdir(), 'temp.py')
-    with open(filepath, "w") as file:
-        file.write(code)
+    try:
+        reply = maya_cmd_port.send(DEBUGPY_ADDRESS_COMMAND)
+    except OSError as e:
+        log('Failed to query debugpy in Maya: ' + str(e), level=WARNING)
+        return None
+
+    if not reply.wait(ATTACH_REPLY_TIMEOUT) or reply.error or not reply.result:
+        return None
+
+    host, _, port = reply.result.strip().rpartition(':')
+    try:
+        return host, int(port)
+    except ValueError:
+        log('Unexpected debugpy address from Maya: ' + reply.result, level=WARNING)
+        return None
+
+
+def send_code_to_maya(code):
+    """
+    Wraps the code string in a mel command, then sends it to Maya.
+    Returns the Reply that Maya's result will be stored in.
+    """
 
-    # Format the mel command to execute the temporary file
-    cmd = EXEC_COMMAND.format(
-        tmp_file_path=filepath.replace('\\', '\\\\\\\\')
+    # Send the code itself when it fits in one read of the commandPort
+    cmd = INLINE_EXEC_COMMAND.format(
+        code=b64encode(code.encode('UTF-8')).decode('ascii')
     )
+    filepath = None
+
+    if len(cmd) > COMMAND_PORT_BUFFER_SIZE:
+        # Otherwise create a temporary file, with a name unique to this
+        # command, populated with the given code to run
+        fd, filepath = mkstemp(prefix='sublime_maya_', suffix='.py')
+        with os.fdopen(fd, "w") as file:
+            file.write(code)
+
+        # Format the mel command to execute the temporary file, the path
+        # is a Python literal inside a MEL string so both need escaping
+        cmd = EXEC_COMMAND.format(
+            tmp_file_path=repr(filepath).replace('\\', '\\\\').replace('"', '\\"')
+        )
 
     # Send the code to maya through the maya socket
-    log("Sending " + cmd + " to Maya")
-    maya_cmd_socket.send(cmd.encode('UTF-8'))
+    log("Sending " + cmd + " to Maya", level=DEBUG)
+    try:
+        reply = maya_cmd_port.send(cmd)
+    except OSError:
+        if filepath:
+            os.remove(filepath)
+        raise
+
+    if filepath:
+        # Maya replies once the file was executed, it is not needed after that
+        reply.add_done_callback(lambda reply: os.remove(filepath))
+
+    return reply
 
 
-def start_debugging(address):
+def start_debugging(address, attach_started=None, reused=False):
     """
     Connects to debugpy in Maya, then starts the threads needed to
     send and receive information from it
@@ -195,43 +330,34 @@ def start_debugging(address):
 
     log("Successfully connected to Maya for debugging. Starting...")
 
+    if attach_started is not None:
+        # Report how long attaching took, to see what reusing debugpy saves
+        report = "Attached to Maya in {:.2f}s ({})\n".format(
+            time.time() - attach_started,
+            "reused running debugpy" if reused else "injected debugpy"
+        )
+        log(report)
+        interface.send(json.dumps(json.loads(OUTPUT_EVENT.format(output=json.dumps(report)))))
+
+    if event_loop:
+        # The loop takes over reading and writing from here
+        event_loop.add_channel(debugpy_channel, debugpy_socket, debugpy_socket)
+        return
+
     # Start a thread that sends requests to debugpy
     run_in_new_thread(debugpy_send_loop)
 
-    fstream = debugpy_socket.makefile()
+    framer = MessageFramer()
 
-    while True:
-        try:
-            # Wait for the CONTENT_HEADER to show up,
-            # then get the length of the content following it
-            content_length = 0
-            while True:
-                header = fstream.readline()
-                if header:
-                    header = header.strip()
-                if not header:
-                    break
-                if header.startswith(CONTENT_HEADER):
-                    content_length = int(header[len(CONTENT_HEADER):])
-
-            # Read the content of the response, then call the callback
-            if content_length > 0:
-                total_content = ""
-                while content_length > 0:
-                    content = fstream.read(content_length)
-                    content_length -= len(content)
-                    total_content += content
-
-                if content_length == 0:
-                    message = total_content
-                    on_receive_from_debugpy(message)
-
-        except Exception as e:
-            # Problem with socket. Close it then return
-
-            log("Failure reading maya's debugpy output: \n" + str(e))
-            debugpy_socket.close()
-            break
+    try:
+        for message in framer.read_messages(debugpy_socket.recv_into):
+            on_receive_from_debugpy(message)
+
+    except Exception as e:
+        # Problem with socket. Close it then return
+        log("Failure reading maya's debugpy output: \n" + str(e), level=ERROR)
+
+    debugpy_socket.close()
 
 
 def debugpy_send_loop():
@@ -249,10 +375,9 @@ def debugpy_send_loop():
             return
         else:
             try:
-                # First send the content header with the length of the message, then send the message
-                debugpy_socket.send(bytes(CONTENT_HEADER + '{}\r\n\r\n'.format(len(msg)), 'UTF-8'))
-                debugpy_socket.send(bytes(msg, 'UTF-8'))
-                log('Sent to debugpy:', msg)
+                # Send the content header with the length of the message, followed by the message
+                debugpy_socket.sendall(frame_message(msg))
+                log('Sent to debugpy:', msg, level=DEBUG)
             except OSError:
                 log("Debug socket closed.")
                 return
@@ -263,28 +388,58 @@ def on_receive_from_debugpy(message):
     Handles messages going from debugpy to the debugger
     """
 
-    # Load the message into a dictionary
-    c = json.loads(message)
-    seq = int(c.get('request_seq', -1))  # a negative seq will never occur
-    cmd = c.get('command', '')
+    # Only the fields needed for routing are read, the message is forwarded as is
+    seq = peek(message, 'request_seq')
+    cmd = peek(message, 'command')
+    route = None
+
+    if seq is None:
+        # An event, or a request from debugpy
+        message_stats.event(peek(message, 'event') or cmd, len(message))
+    else:
+        route = seq_router.resolve(seq)
+        if route is not None:
+            message_stats.response(route.command, route.received, len(message))
+        elif seq_router.was_resolved(seq):
+            log("Dropping duplicate response:", message, level=DEBUG)
+            return
+        else:
+            # Its request was forgotten to keep the table bounded, forward it
+            # anyway since a missing response hangs the debugger
+            log("Forwarding response to an unknown request:", message, level=WARNING)
 
     if cmd == 'configurationDone':
         # When Debugger & debugpy are done setting up, send the code to debug
         send_code_to_maya(run_code)
 
+    elif cmd == 'disconnect':
+        # The session is over, keep its statistics
+        write_stats()
+
     # Send responses and events to debugger
-    if seq in processed_seqs:
+    if route is not None and route.route == ANSWERED:
         # Should only be the initialization request
-        log("Already processed, debugpy response is:", message)
+        log("Already processed, debugpy response is:", message, level=DEBUG)
     else:
         # Send the message normally to the debugger
-        log('Received from debugpy:', message)
+        log('Received from debugpy:', message, level=DEBUG)
         interface.send(message)
 
 
+def write_stats():
+    """
+    Writes the statistics of the session so far, replacing the previous ones
+    """
+
+    try:
+        message_stats.write(stats_file)
+    except Exception as e:
+        log("Failure writing statistics: " + str(e), level=ERROR)
+
+
 if __name__ == '__main__':
     try:
         main()
     except Exception as e:
-        log(str(e))
+        log(str(e), level=ERROR)
         raise e
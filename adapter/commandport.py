@@ -0,0 +1,182 @@
+
+from threading import Thread, Event, Lock
+from collections import deque
+from util import log, DEBUG, WARNING, ERROR
+import socket
+
+
+CONNECT_TIMEOUT = 3
+
+# Maya ends each reply sent back through a commandPort with a null character
+REPLY_END = b'\x00'
+
+
+class Reply:
+    """
+    The result of a command sent to Maya, filled in once Maya replies
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self.result = None
+        self.error = None
+        self._done = Event()
+        self._callbacks = []
+        self._lock = Lock()
+
+    def wait(self, timeout=None):
+        """
+        Blocks until Maya replied, returns False if it didn't in time
+        """
+
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, callback):
+        """
+        Calls callback(reply) once Maya replied, right away if it already did
+        """
+
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+
+        callback(self)
+
+    def _resolve(self, result=None, error=None):
+        with self._lock:
+            self.result = result
+            self.error = error
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                log("Failure in reply callback: " + str(e), level=ERROR)
+
+
+class CommandPort:
+    """
+    A connection to one of Maya's commandPorts, kept open for the whole
+    debug session instead of reconnecting for every command.
+
+    Commands are sent whole, and Maya executes and answers them in order,
+    so each reply is matched to the oldest command still waiting for one.
+
+    Replies are read on a dedicated thread, or by the event loop if given one.
+    """
+
+    def __init__(self, host, port, loop=None):
+        self.address = (host, port)
+        self.loop = loop
+        self._socket = None
+        self._send_lock = Lock()
+        self._pending = deque()
+        self._received = b''
+        self._alive = False
+
+    def connect(self, timeout=CONNECT_TIMEOUT):
+        sock = socket.create_connection(self.address, timeout)
+        sock.settimeout(None)
+
+        self._socket = sock
+        self._received = b''
+        self._alive = True
+
+        if self.loop:
+            self.loop.add_reader(sock, lambda: self._read_available(sock))
+        else:
+            Thread(target=self._read_replies, args=(sock,), name='maya-commandport', daemon=True).start()
+
+    def is_alive(self):
+        return self._alive
+
+    def send(self, command):
+        """
+        Sends a command to Maya and returns the Reply that will hold its result
+        """
+
+        reply = Reply(command)
+
+        with self._send_lock:
+            if not self._alive:
+                raise OSError("Not connected to Maya at {}:{}".format(*self.address))
+
+            # Queued before sending so the reply can never arrive first
+            self._pending.append(reply)
+            try:
+                self._socket.sendall(command.encode('UTF-8'))
+            except OSError as e:
+                self._disconnect(e)
+                raise
+
+        return reply
+
+    def close(self):
+        with self._send_lock:
+            self._disconnect(OSError("Connection to Maya closed"))
+
+    def _read_replies(self, sock):
+        """
+        Reads Maya's replies until the connection closes
+        """
+
+        while self._read_available(sock):
+            pass
+
+    def _read_available(self, sock):
+        """
+        Reads what Maya sent and hands each complete reply to the command it answers.
+        Returns False once the connection is closed.
+        """
+
+        try:
+            chunk = sock.recv(4096)
+            error = None if chunk else OSError("Maya closed the connection")
+        except OSError as e:
+            error = e
+
+        if error:
+            with self._send_lock:
+                if self._socket is sock:
+                    self._disconnect(error)
+            return False
+
+        self._received += chunk
+        *replies, self._received = self._received.split(REPLY_END)
+
+        for result in replies:
+            result = result.rstrip(b'\n').decode('UTF-8', 'replace')
+            try:
+                reply = self._pending.popleft()
+            except IndexError:
+                log("Unexpected reply from Maya: " + result, level=WARNING)
+                continue
+
+            log("Maya replied to " + reply.command + ": " + result, level=DEBUG)
+            reply._resolve(result)
+
+        return True
+
+    def _disconnect(self, error):
+        """
+        Closes the socket and fails every command still waiting for a reply.
+        Must be called with the send lock held.
+        """
+
+        self._alive = False
+
+        if self._socket is not None:
+            if self.loop:
+                self.loop.remove(self._socket)
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+        while self._pending:
+            self._pending.popleft()._resolve(error=error)
+
@@ -0,0 +1,311 @@
+
+from framing import MessageFramer, frame_message
+from threading import Lock, get_ident
+from collections import deque
+from util import log, DEBUG, ERROR
+import selectors
+import socket
+import sys
+import os
+
+
+# Reading from every channel stops while one of them has more than this many
+# bytes waiting to be written, and resumes once it's down to the low mark
+HIGH_WATER_MARK = 4 * 1024 * 1024
+LOW_WATER_MARK = 1024 * 1024
+
+
+class Channel:
+    """
+    One side of the proxy handled by the event loop. DAP messages are framed
+    out of what is read from its reader, and sent messages are queued until
+    the loop writes them out, all at once, to its writer.
+
+    The reader and writer can be sockets or file descriptors, and may be
+    attached after messages were sent, those are kept until then.
+    """
+
+    def __init__(self, name, on_receive=None, on_close=None):
+        self.name = name
+        self.on_receive = on_receive
+        self.on_close = on_close
+        self.reader = None
+        self.writer = None
+        self.loop = None
+        self._framer = MessageFramer()
+        self._output = deque()
+        self._output_size = 0
+        self._lock = Lock()
+
+    def send(self, message):
+        """
+        Queues a message, can be called from any thread
+        """
+
+        frame = frame_message(message)
+        with self._lock:
+            self._output.append(frame)
+            self._output_size += len(frame)
+
+        if self.loop:
+            self.loop.wakeup()
+
+    def backlog(self):
+        return self._output_size
+
+    def _read(self):
+        """
+        Reads what is available and passes on every complete message.
+        Returns False once the reader reached its end.
+        """
+
+        view = self._framer.read_buffer()
+        try:
+            if isinstance(self.reader, socket.socket):
+                count = self.reader.recv_into(view)
+            else:
+                count = os.readv(self.reader, [view])
+        except (BlockingIOError, InterruptedError):
+            return True
+
+        if not count:
+            return False
+
+        self._framer.commit(count)
+        for message in self._framer.messages():
+            self.on_receive(message)
+
+        return True
+
+    def _flush(self):
+        """
+        Writes every queued frame in one call, keeping what didn't fit.
+        Returns True if everything was written.
+        """
+
+        with self._lock:
+            if not self._output:
+                return True
+            data = b''.join(self._output)
+            self._output.clear()
+
+        try:
+            if isinstance(self.writer, socket.socket):
+                count = self.writer.send(data)
+            else:
+                count = os.write(self.writer, data)
+        except (BlockingIOError, InterruptedError):
+            count = 0
+
+        with self._lock:
+            if count < len(data):
+                self._output.appendleft(data[count:])
+            self._output_size -= count
+
+            return not self._output
+
+
+class EventLoop:
+    """
+    Multiplexes every channel and registered reader on a single thread.
+    Writes queued from any thread are coalesced and flushed once per wakeup.
+    """
+
+    def __init__(self):
+        self.running = False
+        self._selector = selectors.DefaultSelector()
+        self._handlers = {}  # file object -> [read callback, write callback]
+        self._channels = []
+        self._calls = deque()
+        self._thread_id = None
+        self._paused = False
+
+        # Written to by other threads to wake the loop up
+        self._wakeup_reader, self._wakeup_writer = socket.socketpair()
+        self._wakeup_reader.setblocking(False)
+        self._wakeup_writer.setblocking(False)
+        self._set_handlers(self._wakeup_reader, self._drain_wakeups, None)
+
+    @staticmethod
+    def is_supported():
+        # Windows can only select on sockets, not on stdin/stdout
+        return sys.platform != 'win32'
+
+    def run(self):
+        """
+        Runs the loop on the calling thread until stop() is called
+        """
+
+        self.running = True
+        self._thread_id = get_ident()
+
+        while self.running:
+            for key, mask in self._selector.select():
+                read_callback, write_callback = key.data
+                try:
+                    if mask & selectors.EVENT_READ and read_callback:
+                        read_callback()
+                    if mask & selectors.EVENT_WRITE and write_callback:
+                        write_callback()
+                except Exception as e:
+                    log("Failure handling " + str(key.fileobj) + " in the event loop: " + str(e), level=ERROR)
+
+            while self._calls:
+                func, args = self._calls.popleft()
+                try:
+                    func(*args)
+                except Exception as e:
+                    log("Failure calling " + getattr(func, '__name__', str(func)) + " in the event loop: " + str(e), level=ERROR)
+
+            self._flush_channels()
+
+    def stop(self):
+        self.call_soon(self._stop)
+
+    def call_soon(self, func, *args):
+        """
+        Runs func on the loop's thread, can be called from any thread
+        """
+
+        self._calls.append((func, args))
+        self.wakeup()
+
+    def wakeup(self):
+        if get_ident() != self._thread_id:
+            try:
+                self._wakeup_writer.send(b'\0')
+            except OSError:
+                pass  # Already full, the loop will wake up anyway
+
+    def add_channel(self, channel, reader, writer):
+        """
+        Starts reading and writing a channel, can be called from any thread
+        """
+
+        channel.loop = self
+        self.call_soon(self._add_channel, channel, reader, writer)
+
+    def add_reader(self, fileobj, callback):
+        """
+        Calls callback() on the loop's thread whenever fileobj is readable
+        """
+
+        self.call_soon(self._set_handlers, fileobj, callback, None)
+
+    def remove(self, fileobj):
+        self.call_soon(self._remove, fileobj)
+
+    def _stop(self):
+        self.running = False
+
+    def _add_channel(self, channel, reader, writer):
+        for fileobj in set((reader, writer)):
+            if isinstance(fileobj, socket.socket):
+                fileobj.setblocking(False)
+            else:
+                os.set_blocking(fileobj, False)
+
+        channel.reader, channel.writer = reader, writer
+        self._channels.append(channel)
+
+        if reader is writer:
+            self._set_handlers(reader, lambda: self._read_channel(channel), lambda: self._flush_channel(channel))
+        else:
+            self._set_handlers(reader, lambda: self._read_channel(channel), None)
+            self._set_handlers(writer, None, lambda: self._flush_channel(channel))
+
+        log("Event loop now handling " + channel.name, level=DEBUG)
+
+    def _read_channel(self, channel):
+        if not channel._read():
+            log(channel.name + " reached its end", level=DEBUG)
+            self._remove_channel(channel)
+
+    def _flush_channel(self, channel):
+        self._set_write_interest(channel, not channel._flush())
+
+    def _flush_channels(self):
+        for channel in self._channels:
+            if channel.writer is not None and channel.backlog():
+                self._flush_channel(channel)
+
+        # Stop reading while a channel can't keep up with what it's sent
+        backlog = max([channel.backlog() for channel in self._channels] or [0])
+        if not self._paused and backlog > HIGH_WATER_MARK:
+            log("Pausing reads, {} bytes waiting to be written".format(backlog), level=DEBUG)
+            self._set_paused(True)
+        elif self._paused and backlog < LOW_WATER_MARK:
+            log("Resuming reads", level=DEBUG)
+            self._set_paused(False)
+
+    def _remove_channel(self, channel):
+        self._channels.remove(channel)
+        for fileobj in set((channel.reader, channel.writer)):
+            self._remove(fileobj)
+            if isinstance(fileobj, socket.socket):
+                fileobj.close()
+
+        if channel.on_close:
+            channel.on_close()
+
+    def _set_paused(self, paused):
+        self._paused = paused
+        for fileobj in list(self._handlers):
+            self._register(fileobj)
+
+    def _set_write_interest(self, channel, interested):
+        handlers = self._handlers.get(channel.writer)
+        if handlers is not None and handlers[2] != interested:
+            handlers[2] = interested
+            self._register(channel.writer)
+
+    def _set_handlers(self, fileobj, read_callback, write_callback):
+        handlers = self._handlers.get(fileobj)
+        if handlers is None:
+            handlers = self._handlers[fileobj] = [None, None, False]
+        if read_callback:
+            handlers[0] = read_callback
+        if write_callback:
+            handlers[1] = write_callback
+        self._register(fileobj)
+
+    def _register(self, fileobj):
+        """
+        Updates what the selector waits for on fileobj: reading unless paused,
+        and writing only while there is output that couldn't be written yet
+        """
+
+        read_callback, write_callback, write_interest = self._handlers[fileobj]
+
+        events = 0
+        if read_callback and (not self._paused or fileobj is self._wakeup_reader):
+            events |= selectors.EVENT_READ
+        if write_callback and write_interest:
+            events |= selectors.EVENT_WRITE
+
+        try:
+            key = self._selector.get_key(fileobj)
+        except KeyError:
+            key = None
+
+        if not events:
+            if key:
+                self._selector.unregister(fileobj)
+        elif key:
+            self._selector.modify(fileobj, events, (read_callback, write_callback))
+        else:
+            self._selector.register(fileobj, events, (read_callback, write_callback))
+
+    def _remove(self, fileobj):
+        if self._handlers.pop(fileobj, None) is not None:
+            try:
+                self._selector.unregister(fileobj)
+            except (KeyError, ValueError, OSError):
+                pass
+
+    def _drain_wakeups(self):
+        try:
+            while self._wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
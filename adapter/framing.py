@@ -0,0 +1,184 @@
+
+from util import CONTENT_HEADER
+import re
+
+
+HEADER_END = b'\r\n\r\n'
+CONTENT_LENGTH = CONTENT_HEADER.strip().rstrip(':').lower().encode('ascii')
+
+CHUNK_SIZE = 64 * 1024
+
+# Top level fields are normally serialized before the body/arguments,
+# so they are looked for in this many leading bytes first
+PEEK_PREFIX = 512
+
+_peek_patterns = {}
+
+
+class MessageFramer:
+    """
+    Splits a stream of bytes into DAP payloads.
+
+    Incoming data is read straight into a growable bytearray through a
+    memoryview, so a payload is only copied once: when it is handed out.
+    Content-Length is a byte count, as the protocol requires.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._buffer = bytearray(chunk_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0  # First byte not yet consumed
+        self._end = 0  # End of the valid data in the buffer
+        self._content_length = None  # Length of the body being waited on
+        self._body_start = 0
+
+    def read_buffer(self):
+        """
+        Returns a writable view over the free space at the end of the buffer,
+        making room first if needed. Call commit() with the number of bytes
+        written into it.
+        """
+
+        needed = self.chunk_size
+        if self._content_length is not None:
+            # Make sure the whole body fits so it never has to be reassembled
+            needed = max(needed, self._body_start + self._content_length - self._end)
+
+        if len(self._buffer) - self._end < needed:
+            self._make_room(needed)
+
+        return self._view[self._end:]
+
+    def commit(self, count):
+        self._end += count
+
+    def feed(self, data):
+        """
+        Copies data into the buffer. Used when the bytes were not
+        read through read_buffer().
+        """
+
+        view = memoryview(data)
+        while view:
+            target = self.read_buffer()
+            count = min(len(target), len(view))
+            target[:count] = view[:count]
+            self.commit(count)
+            view = view[count:]
+
+    def messages(self):
+        """
+        Yields every complete payload currently buffered, as bytes.
+        """
+
+        while True:
+            message = self._next_message()
+            if message is None:
+                return
+            yield message
+
+    def read_messages(self, readinto):
+        """
+        Yields payloads read with readinto(), a function behaving like
+        socket.recv_into, until it reports the end of the stream.
+        """
+
+        while True:
+            for message in self.messages():
+                yield message
+
+            count = readinto(self.read_buffer())
+            if not count:
+                return
+            self.commit(count)
+
+    def _next_message(self):
+        if self._content_length is None:
+            header_end = self._buffer.find(HEADER_END, self._start, self._end)
+            if header_end < 0:
+                return None
+
+            self._content_length = self._parse_content_length(self._start, header_end)
+            self._body_start = header_end + len(HEADER_END)
+
+        body_end = self._body_start + self._content_length
+        if body_end > self._end:
+            return None
+
+        message = bytes(self._view[self._body_start:body_end])
+        self._content_length = None
+        self._start = body_end
+
+        if self._start == self._end:
+            self._start = self._end = 0
+
+        return message
+
+    def _parse_content_length(self, start, end):
+        for line in self._view[start:end].tobytes().split(b'\r\n'):
+            name, _, value = line.partition(b':')
+            if name.strip().lower() == CONTENT_LENGTH:
+                return int(value)
+
+        # A header block without a length carries no body
+        return 0
+
+    def _make_room(self, needed):
+        """
+        Moves the unconsumed data to the front of the buffer,
+        and grows the buffer if that is still not enough.
+        """
+
+        pending = self._end - self._start
+        size = len(self._buffer)
+        if size - pending < needed:
+            size = max(size * 2, pending + needed)
+
+        # The view must be released before the bytearray can be resized
+        self._view.release()
+
+        if size != len(self._buffer):
+            self._buffer = self._buffer[self._start:self._end] + bytearray(size - pending)
+        elif self._start:
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+
+        self._view = memoryview(self._buffer)
+        self._body_start -= self._start
+        self._start, self._end = 0, pending
+
+
+def frame_message(message):
+    """
+    Returns the bytes to send for a payload given as str or bytes,
+    with a Content-Length counted in bytes.
+    """
+
+    if not isinstance(message, bytes):
+        message = message.encode('UTF-8')
+
+    return (CONTENT_HEADER + '{}\r\n\r\n'.format(len(message))).encode('ascii') + message
+
+
+def peek(message, key):
+    """
+    Returns the value of a string or integer field of a raw JSON payload
+    without decoding the whole message, or None if it isn't present.
+
+    Only meant for fields that are not nested, like "command" or "request_seq".
+    """
+
+    pattern = _peek_patterns.get(key)
+    if pattern is None:
+        pattern = _peek_patterns[key] = re.compile(
+            br'(?<!\\)"' + re.escape(key.encode('ascii')) + br'"\s*:\s*(?:"((?:[^"\\]|\\.)*)"|(-?\d+)(?=\s*[,}]))'
+        )
+
+    match = pattern.search(message, 0, PEEK_PREFIX) or pattern.search(message)
+    if match is None:
+        return None
+
+    string, number = match.groups()
+    if number is not None:
+        return int(number)
+    return string.decode('UTF-8')
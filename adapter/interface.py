@@ -1,22 +1,34 @@
 
 from sys import stdin, stdout
 from queue import Queue
-from util import CONTENT_HEADER, run_in_new_thread, log
+from framing import MessageFramer, frame_message
+from eventloop import Channel
+from util import run_in_new_thread, log, DEBUG, ERROR
 
 
 class DebuggerInterface:
     """
     Provides a simple interface to capture and send 
     messages from/to the debugger vis stdin/stdout.
+
+    When given an event loop, stdin/stdout are handled by it
+    instead of by dedicated threads.
     """
 
-    def __init__(self, on_receive = None):
+    def __init__(self, on_receive = None, loop = None):
         self.send_queue = Queue()
         self.running = False
         self.callback = on_receive
+        self.loop = loop
+        self.channel = None
 
     def start(self):
         if not self.running:
+            if self.loop:
+                self.start_nonblocking()
+                self.loop.run()
+                return
+
             self.running = True
             run_in_new_thread(self._debugger_send_loop)
             self._read_debugger_input()
@@ -24,6 +36,12 @@ class DebuggerInterface:
     def start_nonblocking(self):
         if not self.running:
             self.running = True
+
+            if self.loop:
+                self.channel = Channel('debugger', on_receive=self.callback, on_close=self.loop.stop)
+                self.loop.add_channel(self.channel, stdin.fileno(), stdout.fileno())
+                return
+
             run_in_new_thread(self._debugger_send_loop)
             run_in_new_thread(self._read_debugger_input)
 
@@ -32,7 +50,11 @@ class DebuggerInterface:
             self.running = False
 
     def send(self, message):
-        self.send_queue.put(message)
+        if self.channel:
+            self.channel.send(message)
+            log('Sent to Debugger:', message, level=DEBUG)
+        else:
+            self.send_queue.put(message)
 
     def _read_debugger_input(self):
         """
@@ -40,33 +62,18 @@ class DebuggerInterface:
         function passed in as the callback with the message recieved.
         """
 
-        while self.running:
-            try:
-                content_length = 0
-                while self.running:
-                    header = stdin.readline()
-                    if header:
-                        header = header.strip()
-                    if not header:
-                        break
-                    if header.startswith(CONTENT_HEADER):
-                        content_length = int(header[len(CONTENT_HEADER):])
-
-                if content_length > 0:
-                    total_content = ""
-                    while content_length > 0:
-                        content = stdin.read(content_length)
-                        content_length -= len(content)
-                        total_content += content
-
-                    if content_length == 0:
-                        message = total_content
-                        if self.callback:
-                            self.callback(message)
-
-            except Exception as e:
-                log("Failure reading stdin: " + str(e))
-                return
+        framer = MessageFramer()
+        reader = getattr(stdin.buffer, 'readinto1', stdin.buffer.readinto)
+
+        try:
+            for message in framer.read_messages(reader):
+                if not self.running:
+                    return
+                if self.callback:
+                    self.callback(message)
+
+        except Exception as e:
+            log("Failure reading stdin: " + str(e), level=ERROR)
 
 
     def _debugger_send_loop(self):
@@ -81,10 +88,9 @@ class DebuggerInterface:
                 return
             else:
                 try:
-                    stdout.write('Content-Length: {}\r\n\r\n'.format(len(msg)))
-                    stdout.write(msg)
-                    stdout.flush()
-                    log('Sent to Debugger:', msg)
+                    stdout.buffer.write(frame_message(msg))
+                    stdout.buffer.flush()
+                    log('Sent to Debugger:', msg, level=DEBUG)
                 except Exception as e:
                     log("Failure writing to stdout (normal on exit):" + str(e))
 
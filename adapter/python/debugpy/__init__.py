@@ -26,6 +26,7 @@ __all__ = [
 
 import codecs
 import os
+import sys
 
 from debugpy import _version
 from debugpy.common import compat
@@ -204,7 +205,20 @@ def trace_this_thread(should_trace):
     return api.trace_this_thread(should_trace)
 
 
-__version__ = _version.get_versions()["version"]
+if sys.version_info >= (3, 7):
+    # In a source tree, computing the version runs git, so only do it when asked.
+    def __getattr__(name):
+        global __version__
+        if name != "__version__":
+            raise AttributeError(
+                "module {0!r} has no attribute {1!r}".format(__name__, name)
+            )
+        __version__ = _version.get_versions()["version"]
+        return __version__
+
+
+else:
+    __version__ = _version.get_versions()["version"]
 
 # Force absolute path on Python 2.
 __file__ = os.path.abspath(__file__)
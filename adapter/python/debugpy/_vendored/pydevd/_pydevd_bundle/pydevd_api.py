@@ -83,6 +83,8 @@ class PyDevdAPI(object):
 
     def run(self, py_db):
         py_db.ready_to_run = True
+        # Wake up PyDB.wait_for_ready_to_run().
+        py_db._py_db_command_thread_event.set()
 
     def notify_initialize(self, py_db):
         py_db.on_initialize()
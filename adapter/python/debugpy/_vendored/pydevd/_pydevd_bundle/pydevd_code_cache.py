@@ -0,0 +1,149 @@
+'''
+Caches for information computed for code objects (such as the file type or whether it's in the
+project scope), which don't keep the code objects alive and have a bounded size.
+
+A process which keeps on compiling code (i.e.: reloading modules or exec'ing '<string>' snippets)
+would otherwise make those caches grow forever (and keep all the dead code objects alive).
+'''
+from collections import OrderedDict
+import weakref
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_FRONT_MAX_SIZE = 2000
+
+try:
+    weakref.ref(compile('', '<string>', 'exec'))
+except TypeError:
+
+    # Code objects can't be weakly referenced (so, we have to rely on the size limit).
+    class _StrongRef(object):
+
+        __slots__ = ['_obj']
+
+        def __init__(self, obj, callback=None):
+            self._obj = obj
+
+        def __call__(self):
+            return self._obj
+
+    _code_ref = _StrongRef
+
+else:
+    _code_ref = weakref.ref
+
+
+class CodeObjectCache(object):
+    '''
+    A mapping whose keys are tuples where the last item is a code object.
+
+    The code object is only weakly referenced (its entries are removed once it's collected) and
+    at most `max_size` entries are kept (the least recently used are evicted first).
+
+    Note: as with a dict, a KeyError is raised by `cache[key]` on a miss (and the number of
+    hits/misses of `cache[key]` is kept in `hits`/`misses` -- lookups done directly in `front`
+    aren't counted). Unlike a dict, code objects are compared by
+    identity (comparing them by value is much slower) -- except in `front` (see below), where
+    code objects which compare equal share the same entry.
+
+    Looking up an entry here is slower than in a dict, so, the entries recently added or used
+    are also kept in `front`, a plain dict which may be used directly in the fast paths (and
+    which is also what the frame evaluator receives). It's cleared whenever it has more than
+    `front_max_size` entries, so, at most that many code objects are kept alive by it.
+    '''
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, front_max_size=DEFAULT_FRONT_MAX_SIZE):
+        self.max_size = max_size
+        self.front_max_size = front_max_size
+        self.front = {}
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (key[:-1], id(code)) -> (ref to code, value)
+
+        # Entries of collected code objects. They're removed from `_entries` in __setitem__
+        # as weakref callbacks may be called at any point (even while `_entries` is being
+        # changed).
+        self._pending_removals = []
+
+        self._move_to_end = getattr(self._entries, 'move_to_end', None)  # Not there on Python 2.
+
+    def __getitem__(self, key):
+        try:
+            value = self.front[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return value
+
+        code = key[-1]
+        entry_key = (key[:-1], id(code))
+        try:
+            code_ref, value = self._entries[entry_key]
+            if code_ref() is not code:
+                # The id() of a collected code object was reused.
+                raise KeyError(key)
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        move_to_end = self._move_to_end
+        if move_to_end is not None:
+            try:
+                move_to_end(entry_key)
+            except KeyError:
+                pass  # Evicted by another thread in the meantime.
+        self._add_to_front(key, value)
+        return value
+
+    def _add_to_front(self, key, value):
+        front = self.front
+        if len(front) >= self.front_max_size:
+            front.clear()
+            if not self.front_max_size:
+                return
+        front[key] = value
+
+    def __setitem__(self, key, value):
+        pending_removals = self._pending_removals
+        entries = self._entries
+        while pending_removals:
+            entry_key, code_ref = pending_removals.pop()
+            entry = entries.get(entry_key)
+            if entry is not None and entry[0] is code_ref:
+                entries.pop(entry_key, None)
+
+        code = key[-1]
+        entry_key = (key[:-1], id(code))
+        pending_removal = pending_removals.append
+
+        def on_code_collected(code_ref):
+            pending_removal((entry_key, code_ref))
+
+        entries[entry_key] = (_code_ref(code, on_code_collected), value)
+        self._add_to_front(key, value)
+
+        while len(entries) > self.max_size:
+            try:
+                entries.popitem(last=False)
+            except KeyError:
+                break  # Emptied by another thread in the meantime.
+
+    def __contains__(self, key):
+        if key in self.front:
+            return True
+        code = key[-1]
+        entry = self._entries.get((key[:-1], id(code)))
+        return entry is not None and entry[0]() is code
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self.front.clear()
+        self._entries.clear()
+        del self._pending_removals[:]
+
+    def __repr__(self):
+        return '<%s: %s entries (max: %s), hits: %s, misses: %s>' % (
+            self.__class__.__name__, len(self._entries), self.max_size, self.hits, self.misses)
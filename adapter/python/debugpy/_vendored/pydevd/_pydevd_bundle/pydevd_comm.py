@@ -137,13 +137,27 @@ if IS_WINDOWS and not IS_JYTHON:
 class ReaderThread(PyDBDaemonThread):
     ''' reader thread reads and dispatches commands in an infinite loop '''
 
+    # The size requested on each read from the socket starts at _MIN_RECV_SIZE and is doubled
+    # (up to _MAX_RECV_SIZE) whenever a read fills it.
+    _MIN_RECV_SIZE = 4096
+    _MAX_RECV_SIZE = 256 * 1024
+
+    # When the buffer is bigger than this (because some big message was received) it's
+    # released once all its contents are consumed.
+    _MAX_BUFFER_SIZE_KEPT = 1024 * 1024
+
     def __init__(self, sock, py_db, PyDevJsonCommandProcessor, process_net_command, terminate_on_socket_close=True):
         assert sock is not None
         PyDBDaemonThread.__init__(self, py_db)
         self.__terminate_on_socket_close = terminate_on_socket_close
 
         self.sock = sock
-        self._buffer = b''
+
+        # The contents received and not yet consumed are in self._buffer[self._buffer_start:self._buffer_end].
+        self._buffer = bytearray(self._MIN_RECV_SIZE)
+        self._buffer_start = 0
+        self._buffer_end = 0
+        self._recv_size = self._MIN_RECV_SIZE
         self.setName("pydevd.Reader")
         self.process_net_command = process_net_command
         self.process_net_command_json = PyDevJsonCommandProcessor(self._from_json).process_net_command_json
@@ -177,43 +191,76 @@ class ReaderThread(PyDBDaemonThread):
         # except:
         #    pass
 
-    def _read(self, size):
-        while True:
-            buffer_len = len(self._buffer)
-            if buffer_len == size:
-                ret = self._buffer
-                self._buffer = b''
-                return ret
+    def _recv(self, min_size):
+        '''
+        Receives more contents from the socket into the buffer (reserving space for at least
+        `min_size` bytes).
 
-            if buffer_len > size:
-                ret = self._buffer[:size]
-                self._buffer = self._buffer[size:]
-                return ret
+        :return bool:
+            False if the socket was closed (or if some error happened reading from it).
+        '''
+        buffer = self._buffer
+        start = self._buffer_start
+        end = self._buffer_end
+        if start == end:
+            start = end = 0
+            if len(buffer) > self._MAX_BUFFER_SIZE_KEPT:
+                # Don't keep the memory used for a big message around.
+                buffer = self._buffer = bytearray(self._recv_size)
+
+        recv_size = max(self._recv_size, min_size)
+        if len(buffer) - end < recv_size:
+            pending = end - start
+            if len(buffer) >= pending + recv_size:
+                # Just move the pending contents to the start.
+                buffer[:pending] = buffer[start:end]
+            else:
+                # Note: a new buffer is created instead of resizing it in-place as resizing
+                # fails if some memoryview of it wasn't collected yet (i.e.: on PyPy).
+                new_buffer = bytearray(max(pending + recv_size, len(buffer) * 2))
+                new_buffer[:pending] = buffer[start:end]
+                buffer = self._buffer = new_buffer
+            start, end = 0, pending
+
+        self._buffer_start = start
+        try:
+            received = self.sock.recv_into(memoryview(buffer)[end:end + recv_size])
+        except OSError:
+            received = 0
 
-            try:
-                r = self.sock.recv(max(size - buffer_len, 1024))
-            except OSError:
-                return b''
-            if not r:
+        if not received:
+            self._buffer_end = end
+            return False
+
+        self._buffer_end = end + received
+        if received >= self._recv_size and self._recv_size < self._MAX_RECV_SIZE:
+            self._recv_size *= 2
+        return True
+
+    def _consume(self, size):
+        start = self._buffer_start
+        self._buffer_start = start + size
+        return memoryview(self._buffer)[start:start + size].tobytes()
+
+    def _read(self, size):
+        while self._buffer_end - self._buffer_start < size:
+            if not self._recv(size - (self._buffer_end - self._buffer_start)):
                 return b''
-            self._buffer += r
+        return self._consume(size)
 
     def _read_line(self):
+        search_start = self._buffer_start
         while True:
-            i = self._buffer.find(b'\n')
+            i = self._buffer.find(b'\n', search_start, self._buffer_end)
             if i != -1:
-                i += 1  # Add the newline to the return
-                ret = self._buffer[:i]
-                self._buffer = self._buffer[i:]
-                return ret
-            else:
-                try:
-                    r = self.sock.recv(1024)
-                except OSError:
-                    return b''
-                if not r:
-                    return b''
-                self._buffer += r
+                return self._consume(i + 1 - self._buffer_start)  # Add the newline to the return
+
+            # Don't search what was already searched again (note: the buffer may be compacted
+            # when receiving, so, keep the offset relative to the start).
+            searched = self._buffer_end - self._buffer_start
+            if not self._recv(1):
+                return b''
+            search_start = self._buffer_start + searched
 
     @overrides(PyDBDaemonThread._on_run)
     def _on_run(self):
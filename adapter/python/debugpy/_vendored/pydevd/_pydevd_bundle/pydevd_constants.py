@@ -282,6 +282,10 @@ else:
 
 SHOW_COMPILE_CYTHON_COMMAND_LINE = is_true_in_env('PYDEVD_SHOW_COMPILE_CYTHON_COMMAND_LINE')
 
+# If true in env, sys.monitoring (PEP 669) is used instead of sys.settrace to receive the
+# events needed for breakpoints/stepping (only available on Python 3.12 onwards).
+USE_SYS_MONITORING = is_true_in_env('PYDEVD_USE_SYS_MONITORING') and hasattr(sys, 'monitoring')
+
 LOAD_VALUES_ASYNC = is_true_in_env('PYDEVD_LOAD_VALUES_ASYNC')
 DEFAULT_VALUE = "__pydevd_value_async"
 ASYNC_EVAL_TIMEOUT_SEC = 60
@@ -1,6 +1,7 @@
 import fnmatch
 import glob
 import os.path
+import re
 import sys
 
 from _pydev_bundle import pydev_log
@@ -97,6 +98,130 @@ def glob_matches_path(path, pattern, sep=os.sep, altsep=os.altsep):
     return _check_matches(patterns, paths)
 
 
+def _translate_glob_segment(pattern, sep):
+    '''
+    Translates a glob for a single path segment to a regular expression (as fnmatch.translate,
+    but `*`, `?` and `[...]` never match the separator).
+    '''
+    escaped_sep = re.escape(sep)
+    not_sep = '[^%s]' % (escaped_sep,)
+    i, n = 0, len(pattern)
+    res = []
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c == '*':
+            res.append(not_sep + '*')
+        elif c == '?':
+            res.append(not_sep)
+        elif c == '[':
+            j = i
+            if j < n and pattern[j] == '!':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            while j < n and pattern[j] != ']':
+                j += 1
+            if j >= n:
+                res.append('\\[')
+            else:
+                stuff = pattern[i:j].replace('\\', '\\\\')
+                i = j + 1
+                if stuff[0] == '!':
+                    stuff = '^' + stuff[1:]
+                elif stuff[0] == '^':
+                    stuff = '\\' + stuff
+                res.append('(?!%s)[%s]' % (escaped_sep, stuff))
+        else:
+            res.append(re.escape(c))
+    return ''.join(res)
+
+
+def _translate_glob_segments(pattern, sep):
+    escaped_sep = re.escape(sep)
+    patterns = pattern.split(sep)
+    if patterns[0] == '':
+        patterns = patterns[1:]
+
+    res = []
+    last = len(patterns) - 1
+    for i, pattern in enumerate(patterns):
+        pattern = normcase(pattern)
+        if pattern == '**':
+            # Any number of segments (but if it's the last one it must match at least one).
+            res.append('(?:%s[^%s]*)%s' % (escaped_sep, escaped_sep, '+' if i == last else '*'))
+        else:
+            res.append(escaped_sep + _translate_glob_segment(pattern, sep))
+    return ''.join(res)
+
+
+def _translate_glob(pattern, sep, altsep):
+    '''
+    Translates a glob to a regular expression to be matched against the value returned by
+    `_glob_subject` (with the same semantics as `glob_matches_path`).
+    '''
+    if altsep:
+        pattern = pattern.replace(altsep, sep)
+
+    if len(pattern) > 1 and pattern[1] == ':':
+        # The drive only has to match if the path has a drive too.
+        return '(?:%s\0%s|\0%s)' % (
+            re.escape(pattern[0].lower()), _translate_glob_segments(pattern[2:], sep), _translate_glob_segments(pattern, sep))
+
+    return '[^\0]?\0' + _translate_glob_segments(pattern, sep)
+
+
+def _glob_subject(path, sep, altsep):
+    '''
+    :return str:
+        The path as the (lower-cased) drive, a NUL char and then each segment preceded by the
+        separator (with the first empty segment removed and normalized as `glob_matches_path`
+        would do).
+    '''
+    if altsep:
+        path = path.replace(altsep, sep)
+
+    drive = ''
+    if len(path) > 1 and path[1] == ':':
+        drive, path = path[0].lower(), path[2:]
+
+    if path and not path.startswith(sep):
+        path = sep + path
+    return drive + '\0' + normcase(path)
+
+
+class GlobsMatcher(object):
+    '''
+    Matches a path against a list of globs at once (the globs are compiled to regular
+    expressions, so, this is much faster than calling `glob_matches_path` for each glob).
+    '''
+
+    # Python 2 doesn't accept more than 100 groups in a regular expression.
+    _MAX_GLOBS_PER_REGEX = 90
+
+    def __init__(self, globs, sep=os.sep, altsep=os.altsep):
+        self._sep = sep
+        self._altsep = altsep
+        self._regexes = []
+        globs = list(globs)
+        for offset in xrange(0, len(globs), self._MAX_GLOBS_PER_REGEX):
+            chunk = globs[offset:offset + self._MAX_GLOBS_PER_REGEX]
+            regex = '(?:%s)\\Z' % ('|'.join('(%s)' % (_translate_glob(pattern, sep, altsep),) for pattern in chunk),)
+            self._regexes.append((offset, re.compile(regex)))
+
+    def match(self, path):
+        '''
+        :return int:
+            The index of the first glob which matches the given path or None if no glob matches it.
+        '''
+        subject = _glob_subject(path, self._sep, self._altsep)
+        for offset, regex in self._regexes:
+            m = regex.match(subject)
+            if m is not None:
+                return offset + m.lastindex - 1
+        return None
+
+
 class FilesFiltering(object):
     '''
     Note: calls at FilesFiltering are uncached.
@@ -106,8 +231,11 @@ class FilesFiltering(object):
 
     def __init__(self):
         self._exclude_filters = []
+        self._compiled_exclude_filters = []
         self._project_roots = []
+        self._project_roots_index = frozenset()
         self._library_roots = []
+        self._library_roots_index = frozenset()
 
         # Filter out libraries?
         self._use_libraries_filter = False
@@ -139,7 +267,7 @@ class FilesFiltering(object):
                 exclude_filters = []
                 for key, val in json.loads(pydevd_filters).items():
                     exclude_filters.append(ExcludeFilter(key, val, True))
-                self._exclude_filters = exclude_filters
+                self.set_exclude_filters(exclude_filters)
             else:
                 # A ';' separated list of strings with globs for the
                 # list of excludes.
@@ -148,7 +276,7 @@ class FilesFiltering(object):
                 for new_filter in filters:
                     if new_filter.strip():
                         new_filters.append(ExcludeFilter(new_filter.strip(), True, True))
-                self._exclude_filters = new_filters
+                self.set_exclude_filters(new_filters)
 
     @classmethod
     def _get_default_library_roots(cls):
@@ -225,6 +353,7 @@ class FilesFiltering(object):
 
     def set_project_roots(self, project_roots):
         self._project_roots = self._fix_roots(project_roots)
+        self._project_roots_index = frozenset(self._project_roots)
         pydev_log.debug("IDE_PROJECT_ROOTS %s\n" % project_roots)
 
     def _get_project_roots(self):
@@ -232,6 +361,7 @@ class FilesFiltering(object):
 
     def set_library_roots(self, roots):
         self._library_roots = self._fix_roots(roots)
+        self._library_roots_index = frozenset(self._library_roots)
         pydev_log.debug("LIBRARY_ROOTS %s\n" % roots)
 
     def _get_library_roots(self):
@@ -255,30 +385,36 @@ class FilesFiltering(object):
                 pydev_log.debug('Not in in_project_roots - library basenames - starts with %s (%s)', received_filename, LIBRARY_CODE_BASENAMES_STARTING_WITH)
             return False
 
-        project_roots = self._get_project_roots()  # roots are absolute/normalized.
+        # roots are absolute/normalized and end with a separator, so, instead of checking
+        # each root, check whether each parent directory of the file is a root (starting
+        # with the longest, as the longest root found is the one that matters).
+        project_roots_index = self._project_roots_index
+        library_roots_index = self._library_roots_index
 
+        sep = '\\' if IS_WINDOWS else '/'
         absolute_normalized_filename = self._absolute_normalized_path(received_filename)
-        absolute_normalized_filename_as_dir = absolute_normalized_filename + ('\\' if IS_WINDOWS else '/')
-
-        found_in_project = []
-        for root in project_roots:
-            if root and (absolute_normalized_filename.startswith(root) or root == absolute_normalized_filename_as_dir):
+        absolute_normalized_filename_as_dir = absolute_normalized_filename + sep
+
+        found_in_project = 0  # Length of the project root matched.
+        found_in_library = 0  # Length of the library root matched.
+        end = len(absolute_normalized_filename_as_dir)
+        while end > 0:
+            root = absolute_normalized_filename_as_dir[:end]
+            if not found_in_project and root in project_roots_index:
                 if DEBUG:
                     pydev_log.debug('In project: %s (%s)', absolute_normalized_filename, root)
-                found_in_project.append(root)
+                found_in_project = end
 
-        found_in_library = []
-        library_roots = self._get_library_roots()
-        for root in library_roots:
-            if root and (absolute_normalized_filename.startswith(root) or root == absolute_normalized_filename_as_dir):
-                found_in_library.append(root)
+            if not found_in_library and root in library_roots_index:
                 if DEBUG:
                     pydev_log.debug('In library: %s (%s)', absolute_normalized_filename, root)
-            else:
-                if DEBUG:
-                    pydev_log.debug('Not in library: %s (%s)', absolute_normalized_filename, root)
+                found_in_library = end
 
-        if not project_roots:
+            if found_in_project or found_in_library:
+                break
+            end = absolute_normalized_filename_as_dir.rfind(sep, 0, end - 1) + 1
+
+        if not project_roots_index:
             # If we have no project roots configured, consider it being in the project
             # roots if it's not found in site-packages (because we have defaults for those
             # and not the other way around).
@@ -287,18 +423,10 @@ class FilesFiltering(object):
                 pydev_log.debug('Final in project (no project roots): %s (%s)', absolute_normalized_filename, in_project)
 
         else:
-            in_project = False
-            if found_in_project:
-                if not found_in_library:
-                    if DEBUG:
-                        pydev_log.debug('Final in project (in_project and not found_in_library): %s (True)', absolute_normalized_filename)
-                    in_project = True
-                else:
-                    # Found in both, let's see which one has the bigger path matched.
-                    if max(len(x) for x in found_in_project) > max(len(x) for x in found_in_library):
-                        in_project = True
-                    if DEBUG:
-                        pydev_log.debug('Final in project (found in both): %s (%s)', absolute_normalized_filename, in_project)
+            # If found in both, the one with the bigger path matched wins.
+            in_project = found_in_project > found_in_library
+            if DEBUG:
+                pydev_log.debug('Final in project: %s (%s)', absolute_normalized_filename, in_project)
 
         return in_project
 
@@ -321,12 +449,14 @@ class FilesFiltering(object):
         :return: True if it should be excluded, False if it should be included and None
             if no rule matched the given file.
         '''
-        for exclude_filter in self._exclude_filters:  # : :type exclude_filter: ExcludeFilter
-            if exclude_filter.is_path:
-                if glob_matches_path(absolute_filename, exclude_filter.name):
-                    return exclude_filter.exclude
+        for globs_matcher, exclude_filters in self._compiled_exclude_filters:
+            if globs_matcher is not None:
+                i = globs_matcher.match(absolute_filename)
+                if i is not None:
+                    return exclude_filters[i].exclude
             else:
                 # Module filter.
+                exclude_filter = exclude_filters[0]
                 if exclude_filter.name == module_name or module_name.startswith(exclude_filter.name + '.'):
                     return exclude_filter.exclude
         return None
@@ -337,7 +467,21 @@ class FilesFiltering(object):
         '''
         self._exclude_filters = exclude_filters
         self.require_module = False
+
+        # Consecutive path filters are matched at once (the order in which the filters are
+        # checked must be kept as the first one which matches is the one used).
+        compiled_exclude_filters = []
+        path_filters = []
         for exclude_filter in exclude_filters:
-            if not exclude_filter.is_path:
+            if exclude_filter.is_path:
+                path_filters.append(exclude_filter)
+            else:
                 self.require_module = True
-                break
+                if path_filters:
+                    compiled_exclude_filters.append((GlobsMatcher(f.name for f in path_filters), path_filters))
+                    path_filters = []
+                compiled_exclude_filters.append((None, [exclude_filter]))
+
+        if path_filters:
+            compiled_exclude_filters.append((GlobsMatcher(f.name for f in path_filters), path_filters))
+        self._compiled_exclude_filters = compiled_exclude_filters
@@ -98,7 +98,10 @@ target namespace.
 
 """
 
-import imp
+try:
+    import imp
+except ImportError:
+    imp = None  # Removed in Python 3.12.
 from _pydev_bundle.pydev_imports import Exec
 from _pydevd_bundle import pydevd_dont_trace
 import sys
@@ -161,6 +164,45 @@ def code_objects_equal(code0, code1):
     return True
 
 
+#=======================================================================================================================
+# _find_module_code
+#=======================================================================================================================
+def _find_module_code(modname, path):
+    '''
+    Returns the code object for the source or byte code of the given module (or None if the module
+    isn't backed by one of those).
+
+    May raise ImportError if the module can't be found.
+    '''
+    if imp is not None:
+        (stream, filename, (suffix, mode, kind)) = imp.find_module(modname, path)
+        try:
+            # Is it Python source code or byte code read from a file?
+            if kind not in (imp.PY_COMPILED, imp.PY_SOURCE):
+                return None
+            if kind == imp.PY_SOURCE:
+                source = stream.read()
+                return compile(source, filename, "exec")
+            else:
+                import marshal
+                return marshal.load(stream)
+        finally:
+            if stream:
+                stream.close()
+
+    from importlib.machinery import PathFinder, SourceFileLoader, SourcelessFileLoader
+    spec = PathFinder.find_spec(modname, path)
+    if spec is None:
+        raise ImportError('No module named %s' % (modname,))
+    if isinstance(spec.loader, SourceFileLoader):
+        with open(spec.origin, 'rb') as stream:
+            source = stream.read()
+        return compile(source, spec.origin, "exec")
+    elif isinstance(spec.loader, SourcelessFileLoader):
+        return spec.loader.get_code(spec.name)
+    return None
+
+
 #=======================================================================================================================
 # xreload
 #=======================================================================================================================
@@ -225,23 +267,11 @@ class Reload:
                 pkg = None
                 path = None  # Make find_module() uses the default search path
             # Find the module; may raise ImportError
-            (stream, filename, (suffix, mode, kind)) = imp.find_module(modname, path)
-            # Turn it into a code object
-            try:
-                # Is it Python source code or byte code read from a file?
-                if kind not in (imp.PY_COMPILED, imp.PY_SOURCE):
-                    # Fall back to built-in reload()
-                    notify_error('Could not find source to reload (mod: %s)' % (modname,))
-                    return
-                if kind == imp.PY_SOURCE:
-                    source = stream.read()
-                    code = compile(source, filename, "exec")
-                else:
-                    import marshal
-                    code = marshal.load(stream)
-            finally:
-                if stream:
-                    stream.close()
+            code = _find_module_code(modname, path)
+            if code is None:
+                # Fall back to built-in reload()
+                notify_error('Could not find source to reload (mod: %s)' % (modname,))
+                return
             # Execute the code.  We copy the module dict to a temporary; then
             # clear the module dict; then execute the new code in the module
             # dict; then swap things back and around.  This trick (due to
@@ -0,0 +1,285 @@
+'''
+A tracing backend based on sys.monitoring (PEP 669), used instead of sys.settrace when
+PYDEVD_USE_SYS_MONITORING is set (Python 3.12 onwards).
+
+With sys.settrace every function call in every thread goes through the debugger. Here,
+a PY_START/PY_RESUME event is received for a code object and, if it doesn't need to be
+traced (i.e.: its file has no breakpoints and no thread is stepping), it's DISABLEd, so,
+that code runs at full speed until the events are restarted (which is done when the
+breakpoints change or a step is requested).
+
+The code objects which do need to be traced get local LINE/PY_RETURN/PY_YIELD events,
+which are translated to the 'line'/'return' events that a regular trace function
+receives, so, all the logic for breakpoints/stepping in PyDBFrame.trace_dispatch is
+reused as is (the local trace function of each frame is kept in frame.f_trace, as with
+sys.settrace).
+
+Exceptions are the exception: RAISE/PY_UNWIND can't be enabled per code object. RAISE
+(translated to 'exception') is only enabled when exception breakpoints other than
+the one for uncaught exceptions are set or some thread is stepping. For uncaught
+exceptions only PY_UNWIND (translated to 'return') is needed: it's received when an
+exception leaves a frame, and the 'exception' that sys.settrace would give to its
+caller is given from there when the caller is traced (as is the case for the topmost
+frame of each thread, which reports the uncaught exceptions).
+'''
+import sys
+
+from _pydev_imps._pydev_saved_modules import threading
+from _pydev_bundle import pydev_log
+from _pydevd_bundle.pydevd_constants import NO_FTRACE
+from pydevd_file_utils import NORM_PATHS_AND_BASE_CONTAINER, get_abs_path_real_path_and_base_from_file
+
+try:
+    monitoring = sys.monitoring
+except AttributeError:
+    monitoring = None  # Python < 3.12
+
+
+class SysMonitoringTracer(object):
+
+    def __init__(self, py_db):
+        self.py_db = py_db
+        self._tool_id = None
+        self._lock = threading.Lock()
+
+        # The code objects which have local events enabled.
+        self._traced_codes = set()
+
+        # Whether some thread is stepping (in which case all the code must be traced).
+        self._is_stepping = False
+
+        # Whether all the code must be traced regardless of breakpoints/stepping (i.e.: when
+        # breaking on caught exceptions or if plugins have line breakpoints).
+        self._trace_all = False
+
+        # Whether RAISE is enabled (see: update).
+        self._raise_enabled = False
+
+        # Threads which already had the tracer for uncaught exceptions set up (see: _set_up_thread).
+        self._thread_local = threading.local()
+
+        events = monitoring.events
+        self._local_events = events.LINE | events.PY_RETURN | events.PY_YIELD
+
+    def start(self):
+        '''
+        :return bool:
+            Whether sys.monitoring is now being used (False if the debugger tool id is
+            already in use by someone else, in which case sys.settrace should be used).
+        '''
+        if self._tool_id is not None:
+            return True
+
+        tool_id = monitoring.DEBUGGER_ID
+        if monitoring.get_tool(tool_id) == 'pydevd':
+            # Left over by the debugger in the parent process (after a fork).
+            monitoring.set_events(tool_id, 0)
+            monitoring.free_tool_id(tool_id)
+
+        try:
+            monitoring.use_tool_id(tool_id, 'pydevd')
+        except ValueError:
+            pydev_log.info('Unable to use sys.monitoring (tool id: %s already used by: %s).',
+                           tool_id, monitoring.get_tool(tool_id))
+            return False
+
+        events = monitoring.events
+        register = monitoring.register_callback
+        register(tool_id, events.PY_START, self._on_start)
+        register(tool_id, events.PY_RESUME, self._on_start)
+        register(tool_id, events.LINE, self._on_line)
+        register(tool_id, events.PY_RETURN, self._on_return)
+        register(tool_id, events.PY_YIELD, self._on_return)
+        register(tool_id, events.RAISE, self._on_raise)
+        register(tool_id, events.PY_UNWIND, self._on_unwind)
+
+        self._tool_id = tool_id
+        pydev_log.debug('Using sys.monitoring for tracing.')
+        self.update()
+        return True
+
+    def stop(self):
+        with self._lock:
+            tool_id = self._tool_id
+            if tool_id is None:
+                return
+            self._tool_id = None
+
+            monitoring.set_events(tool_id, 0)
+            for code in self._traced_codes:
+                monitoring.set_local_events(tool_id, code, 0)
+            self._traced_codes.clear()
+
+            events = monitoring.events
+            for event in (events.PY_START, events.PY_RESUME, events.LINE, events.PY_RETURN,
+                          events.PY_YIELD, events.RAISE, events.PY_UNWIND):
+                monitoring.register_callback(tool_id, event, None)
+            monitoring.free_tool_id(tool_id)
+
+    def update(self, remove_untraced=True):
+        '''
+        Must be called whenever the breakpoints change or a thread starts/stops stepping.
+
+        :param bool remove_untraced:
+            If True, code objects which don't need to be traced anymore stop receiving
+            local events.
+        '''
+        with self._lock:
+            tool_id = self._tool_id
+            if tool_id is None:
+                return
+
+            py_db = self.py_db
+            self._is_stepping = self._is_any_thread_stepping()
+            self._trace_all = bool(
+                py_db.has_plugin_line_breaks or
+                py_db.has_plugin_exception_breaks or
+                py_db.break_on_caught_exceptions or
+                py_db.break_on_user_uncaught_exceptions
+            )
+
+            # Note: RAISE is received for every exception raised anywhere, so, it's only
+            # enabled when actually needed.
+            self._raise_enabled = self._trace_all or self._is_stepping
+
+            events = monitoring.events
+            global_events = events.PY_START | events.PY_RESUME
+            if self._raise_enabled:
+                global_events |= events.RAISE | events.PY_UNWIND
+            elif py_db.break_on_uncaught_exceptions:
+                global_events |= events.PY_UNWIND
+            monitoring.set_events(tool_id, global_events)
+
+            if remove_untraced:
+                for code in list(self._traced_codes):
+                    if not self._should_trace(code):
+                        monitoring.set_local_events(tool_id, code, 0)
+                        self._traced_codes.discard(code)
+
+            # Code which was DISABLEd must be re-evaluated.
+            monitoring.restart_events()
+
+    def trace_frame(self, frame):
+        '''
+        Starts receiving local events for a frame which is already running (its f_trace
+        must already be set).
+        '''
+        code = frame.f_code
+        if code not in self._traced_codes and self._tool_id is not None:
+            self._traced_codes.add(code)
+            monitoring.set_local_events(self._tool_id, code, self._local_events)
+
+    def _is_any_thread_stepping(self):
+        threading_active = self.py_db.threading_active
+        if threading_active is None:
+            return True  # We can't know (so, be conservative).
+
+        for t in list(threading_active.values()):
+            additional_info = getattr(t, 'additional_info', None)
+            if additional_info is not None and additional_info.pydev_step_cmd != -1:
+                return True
+        return False
+
+    def _should_trace(self, code):
+        if self._is_stepping or self._trace_all:
+            return True
+
+        filename = code.co_filename
+        try:
+            abs_path_canonical_path_and_base = NORM_PATHS_AND_BASE_CONTAINER[filename]
+        except KeyError:
+            abs_path_canonical_path_and_base = get_abs_path_real_path_and_base_from_file(filename)
+        return abs_path_canonical_path_and_base[1] in self.py_db.breakpoints
+
+    def _dispatch(self, frame, f_trace, event, arg):
+        try:
+            ret = f_trace(frame, event, arg)
+        except:
+            pydev_log.exception()
+            return None
+        frame.f_trace = ret
+        return ret
+
+    def _on_start(self, code, instruction_offset):
+        if not self._should_trace(code):
+            return monitoring.DISABLE
+
+        frame = sys._getframe(1)
+        ret = self._dispatch(frame, self.py_db.get_thread_local_trace_func(), 'call', None)
+        if ret is not None and ret is not NO_FTRACE:
+            self.trace_frame(frame)
+
+    def _on_line(self, code, line_number):
+        frame = sys._getframe(1)
+        f_trace = frame.f_trace
+        if f_trace is not None and f_trace is not NO_FTRACE:
+            self._dispatch(frame, f_trace, 'line', None)
+
+    def _on_return(self, code, instruction_offset, retval):
+        frame = sys._getframe(1)
+        f_trace = frame.f_trace
+        if f_trace is not None and f_trace is not NO_FTRACE:
+            self._dispatch(frame, f_trace, 'return', retval)
+
+    def _set_up_thread(self, frame):
+        '''
+        Sets the tracer for uncaught exceptions in the topmost frame of the current thread
+        (with sys.settrace this is done in the first 'call' of the thread, but here code
+        which doesn't need to be traced never goes through the thread trace function).
+
+        :return bool:
+            Whether the topmost frame may have changed its f_trace.
+        '''
+        if getattr(self._thread_local, 'set_up', False):
+            return False
+
+        py_db = self.py_db
+        thread = py_db.threading_active.get(py_db.threading_get_ident())
+        if thread is None:
+            return False  # Still starting (check again in the next exception).
+
+        if getattr(thread, 'pydev_do_not_trace', False):
+            self._thread_local.set_up = True
+            return False
+
+        thread_trace_func, _apply_to_settrace = py_db.fix_top_level_trace_and_get_trace_func(py_db, frame)
+        if thread_trace_func is None:
+            return False  # Not in the thread entry point yet (i.e.: still in pydevd.main()).
+
+        self._thread_local.set_up = True
+        return True
+
+    def _on_raise(self, code, instruction_offset, exception):
+        frame = sys._getframe(1)
+        f_trace = frame.f_trace
+        if f_trace is None or f_trace is NO_FTRACE:
+            if not self._set_up_thread(frame):
+                return
+            f_trace = frame.f_trace
+            if f_trace is None or f_trace is NO_FTRACE:
+                return
+
+        self._dispatch(frame, f_trace, 'exception', (type(exception), exception, exception.__traceback__))
+
+    def _on_unwind(self, code, instruction_offset, exception):
+        frame = sys._getframe(1)
+        f_trace = frame.f_trace
+        if f_trace is not None and f_trace is not NO_FTRACE:
+            self._dispatch(frame, f_trace, 'return', None)
+
+        if self._raise_enabled:
+            return  # The caller receives the 'exception' from RAISE.
+
+        back = frame.f_back
+        if back is None:
+            return
+
+        f_trace = back.f_trace
+        if f_trace is None or f_trace is NO_FTRACE:
+            if not self._set_up_thread(frame):
+                return
+            f_trace = back.f_trace
+            if f_trace is None or f_trace is NO_FTRACE:
+                return
+
+        self._dispatch(back, f_trace, 'exception', (type(exception), exception, exception.__traceback__))
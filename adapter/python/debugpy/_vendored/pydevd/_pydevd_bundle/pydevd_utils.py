@@ -1,6 +1,5 @@
 from __future__ import nested_scopes
 import traceback
-import warnings
 from _pydev_bundle import pydev_log
 from _pydev_imps._pydev_saved_modules import thread
 import signal
@@ -28,12 +27,8 @@ def save_main_module(file, module_name):
     sys.modules[module_name] = sys.modules['__main__']
     sys.modules[module_name].__name__ = module_name
 
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore", category=DeprecationWarning)
-        warnings.simplefilter("ignore", category=PendingDeprecationWarning)
-        from imp import new_module
-
-    m = new_module('__main__')
+    from types import ModuleType
+    m = ModuleType('__main__')
     sys.modules['__main__'] = m
     if hasattr(sys.modules[module_name], '__loader__'):
         m.__loader__ = getattr(sys.modules[module_name], '__loader__')
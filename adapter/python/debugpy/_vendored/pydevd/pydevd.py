@@ -41,7 +41,7 @@ from _pydevd_bundle.pydevd_constants import (IS_JYTH_LESS25, get_thread_id, get_
     dict_keys, dict_iter_items, DebugInfoHolder, PYTHON_SUSPEND, STATE_SUSPEND, STATE_RUN, get_frame,
     clear_cached_thread_id, INTERACTIVE_MODE_AVAILABLE, SHOW_DEBUG_INFO_ENV, IS_PY34_OR_GREATER, IS_PY2, NULL,
     NO_FTRACE, IS_IRONPYTHON, JSON_PROTOCOL, IS_CPYTHON, HTTP_JSON_PROTOCOL, USE_CUSTOM_SYS_CURRENT_FRAMES_MAP, call_only_once,
-    ForkSafeLock, IGNORE_BASENAMES_STARTING_WITH, EXCEPTION_TYPE_UNHANDLED)
+    ForkSafeLock, IGNORE_BASENAMES_STARTING_WITH, EXCEPTION_TYPE_UNHANDLED, USE_SYS_MONITORING)
 from _pydevd_bundle.pydevd_defaults import PydevdCustomization  # Note: import alias used on pydev_monkey.
 from _pydevd_bundle.pydevd_custom_frames import CustomFramesContainer, custom_frames_container_init
 from _pydevd_bundle.pydevd_dont_trace_files import DONT_TRACE, PYDEV_FILE, LIB_FILE, DONT_TRACE_DIRS
@@ -74,6 +74,7 @@ from _pydevd_bundle.pydevd_process_net_command import process_net_command
 from _pydevd_bundle.pydevd_net_command import NetCommand
 
 from _pydevd_bundle.pydevd_breakpoints import stop_on_unhandled_exception
+from _pydevd_bundle.pydevd_code_cache import CodeObjectCache
 from _pydevd_bundle.pydevd_collect_bytecode_info import collect_try_except_info, collect_return_info
 from _pydevd_bundle.pydevd_suspended_frames import SuspendedFramesManager
 from socket import SHUT_RDWR
@@ -141,6 +142,7 @@ if SUPPORT_PLUGINS:
 
 threadingEnumerate = threading.enumerate
 threadingCurrentThread = threading.currentThread
+threadingActiveCount = getattr(threading, 'active_count', None) or threading.activeCount
 
 try:
     'dummy'.encode('utf-8')  # Added because otherwise Jython 2.2.1 wasn't finding the encoding (if it wasn't loaded in the main thread).
@@ -152,7 +154,7 @@ _global_redirect_stderr_to_server = False
 
 file_system_encoding = getfilesystemencoding()
 
-_CACHE_FILE_TYPE = {}
+_CACHE_FILE_TYPE = CodeObjectCache()
 
 pydev_log.debug('Using GEVENT_SUPPORT: %s', pydevd_constants.SUPPORT_GEVENT)
 pydev_log.debug('pydevd __file__: %s', os.path.abspath(__file__))
@@ -178,11 +180,15 @@ class PyDBCommandThread(PyDBDaemonThread):
 
         try:
             while not self._kill_received:
+                # Note: commands posted to '*' set the event, so, it must be cleared before
+                # processing them (otherwise a command posted during the processing could
+                # wait until the timeout). The timeout is just to check whether the number of
+                # threads changed (see: PyDB.process_internal_commands).
+                self._py_db_command_thread_event.clear()
                 try:
                     self.py_db.process_internal_commands()
                 except:
                     pydev_log.info('Finishing debug communication...(2)')
-                self._py_db_command_thread_event.clear()
                 self._py_db_command_thread_event.wait(0.3)
         except:
             try:
@@ -572,6 +578,10 @@ class PyDB(object):
         # Note: also access '_enable_thread_notifications' with '_lock_running_thread_ids'
         self._enable_thread_notifications = False
 
+        # The number of threads alive when the threads were last enumerated in process_internal_commands
+        # (None means that they must be enumerated again).
+        self._threads_count_checked = None
+
         self._set_breakpoints_with_id = False
 
         # This attribute holds the file-> lines which have an @IgnoreException.
@@ -601,6 +611,10 @@ class PyDB(object):
         # this flag disables frame evaluation even if it's available
         self.use_frame_eval = True
 
+        # If True, sys.monitoring is used instead of sys.settrace (see: enable_tracing).
+        self.use_sys_monitoring = USE_SYS_MONITORING
+        self.sys_monitoring_tracer = None
+
         # If True, pydevd will send a single notification when all threads are suspended/resumed.
         self._threads_suspended_single_notification = ThreadsSuspendedSingleNotification(self)
 
@@ -651,9 +665,11 @@ class PyDB(object):
         self.PYDEV_FILE = PYDEV_FILE
         self.LIB_FILE = LIB_FILE
 
-        self._in_project_scope_cache = {}
+        # Note: the caches with code objects in their keys don't keep the code alive and have a
+        # bounded size.
+        self._in_project_scope_cache = CodeObjectCache()
         self._exclude_by_filter_cache = {}
-        self._apply_filter_cache = {}
+        self._apply_filter_cache = CodeObjectCache()
         self._ignore_system_exit_codes = set()
 
         # DAP related
@@ -865,6 +881,10 @@ class PyDB(object):
         # Note 3: this cache key is repeated in pydevd_frame_evaluator.pyx:get_func_code_info (for
         # speedups).
         cache_key = (frame.f_code.co_firstlineno, abs_real_path_and_basename[0], frame.f_code)
+        try:
+            return _cache_file_type.front[cache_key]  # Fast path (a plain dict).
+        except KeyError:
+            pass
         try:
             return _cache_file_type[cache_key]
         except:
@@ -906,7 +926,8 @@ class PyDB(object):
         return not _CACHE_FILE_TYPE
 
     def get_cache_file_type(self, _cache=_CACHE_FILE_TYPE):  # i.e.: Make it local.
-        return _cache
+        # Note: the frame evaluator requires a dict (misses go through get_file_type()).
+        return _cache.front
 
     def get_thread_local_trace_func(self):
         try:
@@ -931,6 +952,13 @@ class PyDB(object):
             this function is called on a multi-threaded program (either programmatically or attach
             to pid).
         '''
+        if self.use_sys_monitoring and self._start_sys_monitoring():
+            # The events from sys.monitoring are received in all threads, we just need to
+            # keep the trace function which should be used for this thread.
+            if thread_trace_func is not None and not apply_to_all_threads:
+                self._local_thread_trace_func.thread_trace_func = thread_trace_func
+            return
+
         if self.frame_eval_func is not None:
             self.frame_eval_func()
             pydevd_tracing.SetTrace(self.dummy_trace_dispatch)
@@ -952,6 +980,17 @@ class PyDB(object):
         if IS_CPYTHON and apply_to_all_threads:
             pydevd_tracing.set_trace_to_threads(thread_trace_func)
 
+    def _start_sys_monitoring(self):
+        if self.sys_monitoring_tracer is None:
+            from _pydevd_bundle.pydevd_sys_monitoring import SysMonitoringTracer
+            tracer = SysMonitoringTracer(self)
+            if not tracer.start():
+                # Fall back to sys.settrace.
+                self.use_sys_monitoring = False
+                return False
+            self.sys_monitoring_tracer = tracer
+        return True
+
     def disable_tracing(self):
         pydevd_tracing.SetTrace(None)
 
@@ -959,6 +998,9 @@ class PyDB(object):
         '''
         When breakpoints change, we have to re-evaluate all the assumptions we've made so far.
         '''
+        if self.sys_monitoring_tracer is not None:
+            self.sys_monitoring_tracer.update()
+
         if not self.ready_to_run:
             # No need to do anything if we're still not running.
             return
@@ -1060,22 +1102,24 @@ class PyDB(object):
             # pydevd files are never considered to be in the project scope.
             file_type = self.get_file_type(frame, abs_real_path_and_basename)
             if file_type == self.PYDEV_FILE:
-                cache[cache_key] = False
+                in_project_scope = False
 
             elif absolute_filename == '<string>':
                 # Special handling for '<string>'
                 if file_type == self.LIB_FILE:
-                    cache[cache_key] = False
+                    in_project_scope = False
                 else:
-                    cache[cache_key] = True
+                    in_project_scope = True
 
             elif self.source_mapping.has_mapping_entry(absolute_filename):
-                cache[cache_key] = True
+                in_project_scope = True
 
             else:
-                cache[cache_key] = self._files_filtering.in_project_roots(absolute_filename)
+                in_project_scope = self._files_filtering.in_project_roots(absolute_filename)
 
-            return cache[cache_key]
+            # Note: the cache may evict entries at any time, so, don't read it back.
+            cache[cache_key] = in_project_scope
+            return in_project_scope
 
     def _clear_filters_caches(self):
         self._in_project_scope_cache.clear()
@@ -1220,6 +1264,11 @@ class PyDB(object):
         return self._files_filtering.require_module
 
     def has_user_threads_alive(self):
+        if hasattr(threading, 'main_thread'):
+            # Fast path: while the main thread is alive there's no need to check all the threads.
+            if is_thread_alive(threading.main_thread()):
+                return True
+
         for t in pydevd_utils.get_non_pydevd_threads():
             if isinstance(t, PyDBDaemonThread):
                 pydev_log.error_once(
@@ -1350,14 +1399,14 @@ class PyDB(object):
         else:
             internal_cmd = InternalThreadCommand(thread_id, method, *args, **kwargs)
         self.post_internal_command(internal_cmd, thread_id)
-        if thread_id == '*':
-            # Notify so that the command is handled as soon as possible.
-            self._py_db_command_thread_event.set()
 
     def post_internal_command(self, int_cmd, thread_id):
         """ if thread_id is *, post to the '*' queue"""
         queue = self.get_internal_queue(thread_id)
         queue.put(int_cmd)
+        if thread_id == '*':
+            # Notify so that the command is handled as soon as possible.
+            self._py_db_command_thread_event.set()
 
     def enable_output_redirection(self, redirect_stdout, redirect_stderr):
         global _global_redirect_stdout_to_server
@@ -1440,6 +1489,7 @@ class PyDB(object):
             # (note that they will appear later on anyways as pydevd does reconcile live/dead threads
             # when processing internal commands, albeit it may take longer and in general this should
             # not be usual as it's expected that the debugger is live before other threads are created).
+            self._threads_count_checked = None
             return
 
         with self._lock_running_thread_ids if use_lock else NULL:
@@ -1488,6 +1538,7 @@ class PyDB(object):
                     # As it was previously disabled, we have to notify about existing threads again
                     # (so, clear the cache related to that).
                     self._running_thread_ids = {}
+                    self._threads_count_checked = None
 
     def process_internal_commands(self):
         '''
@@ -1499,10 +1550,20 @@ class PyDB(object):
 
         dispose = False
         with self._main_lock:
-            program_threads_alive = {}
+            program_threads_alive = None
             if ready_to_run:
                 self.check_output_redirect()
 
+            # Threads notify about their creation and exit themselves when started through the
+            # threading/thread modules (see: pydev_monkey._NewThreadStartupWithTrace), so, it's only
+            # needed to enumerate the threads to reconcile the ones which are not (i.e.: dummy
+            # threads, threads which were running before the debugger was attached or when the
+            # notifications are reset) and this is only done if the number of threads changed.
+            threads_count = threadingActiveCount()
+            if ready_to_run and threads_count != self._threads_count_checked:
+                self._threads_count_checked = threads_count
+                program_threads_alive = {}
+
                 all_threads = threadingEnumerate()
                 program_threads_dead = []
                 with self._lock_running_thread_ids:
@@ -1540,7 +1601,7 @@ class PyDB(object):
             cmds_to_execute = []
 
             # Without self._lock_running_thread_ids
-            if len(program_threads_alive) == 0 and ready_to_run:
+            if program_threads_alive is not None and len(program_threads_alive) == 0:
                 dispose = True
             else:
                 # Actually process the commands now (make sure we don't have a lock for _lock_running_thread_ids
@@ -1974,6 +2035,10 @@ class PyDB(object):
                 info.pydev_step_cmd = -1
                 info.pydev_state = STATE_RUN
 
+        if self.sys_monitoring_tracer is not None:
+            # The thread may have stopped stepping.
+            self.sys_monitoring_tracer.update()
+
         del frame
         cmd = self.cmd_factory.make_thread_run_message(get_current_thread_id(thread), info.pydev_step_cmd)
         self.writer.add_command(cmd)
@@ -2006,6 +2071,11 @@ class PyDB(object):
         disable = kwargs.pop('disable', False)
         assert not kwargs
 
+        sys_monitoring_tracer = self.sys_monitoring_tracer
+        if sys_monitoring_tracer is not None and not disable:
+            # A thread may have started stepping.
+            sys_monitoring_tracer.update(remove_untraced=False)
+
         while frame is not None:
             # Don't change the tracing on debugger-related files
             file_type = self.get_file_type(frame)
@@ -2016,9 +2086,13 @@ class PyDB(object):
                     if frame.f_trace is not None and frame.f_trace is not NO_FTRACE:
                         frame.f_trace = NO_FTRACE
 
-                elif frame.f_trace is not self.trace_dispatch:
-                    pydev_log.debug('Set tracing of frame: %s - %s', frame.f_code.co_filename, frame.f_code.co_name)
-                    frame.f_trace = self.trace_dispatch
+                else:
+                    if frame.f_trace is not self.trace_dispatch:
+                        pydev_log.debug('Set tracing of frame: %s - %s', frame.f_code.co_filename, frame.f_code.co_name)
+                        frame.f_trace = self.trace_dispatch
+
+                    if sys_monitoring_tracer is not None:
+                        sys_monitoring_tracer.trace_frame(frame)
             else:
                 pydev_log.debug('SKIP set tracing of frame: %s - %s', frame.f_code.co_filename, frame.f_code.co_name)
 
@@ -2157,11 +2231,12 @@ class PyDB(object):
         self.start_auxiliary_daemon_threads()
 
     def patch_threads(self):
-        try:
-            # not available in jython!
-            threading.settrace(self.trace_dispatch)  # for all future threads
-        except:
-            pass
+        if not self.use_sys_monitoring:
+            try:
+                # not available in jython!
+                threading.settrace(self.trace_dispatch)  # for all future threads
+            except:
+                pass
 
         from _pydev_bundle.pydev_monkey import patch_thread_modules
         patch_thread_modules()
@@ -2773,6 +2848,9 @@ def stoptrace():
     pydev_log.debug("pydevd.stoptrace()")
     pydevd_tracing.restore_sys_set_trace_func()
     sys.settrace(None)
+    py_db = get_global_debugger()
+    if py_db is not None and py_db.sys_monitoring_tracer is not None:
+        py_db.sys_monitoring_tracer.stop()
     try:
         # not available in jython!
         threading.settrace(None)  # for all future threads
@@ -5,6 +5,13 @@ import platform
 TEST_CYTHON = os.getenv('PYDEVD_USE_CYTHON', None) == 'YES'
 PYDEVD_TEST_VM = os.getenv('PYDEVD_TEST_VM', None)
 
+# Benchmarks only report timings (run them with `-s` to see those).
+TEST_BENCHMARKS = os.getenv('PYDEVD_TEST_BENCHMARKS', None) == 'YES'
+
+# Where debugpy is when this pydevd is the one vendored in it.
+DEBUGPY_PARENT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', '..'))
+TEST_DEBUGPY = os.path.exists(os.path.join(DEBUGPY_PARENT_DIR, 'debugpy', 'common', 'messaging.py'))
+
 IS_PY3K = sys.version_info[0] >= 3
 IS_PY36_OR_GREATER = sys.version_info[0:2] >= (3, 6)
 IS_CPYTHON = platform.python_implementation() == 'CPython'
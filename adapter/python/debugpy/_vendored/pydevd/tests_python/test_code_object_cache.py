@@ -0,0 +1,87 @@
+from _pydevd_bundle.pydevd_code_cache import CodeObjectCache
+from _pydevd_bundle.pydevd_constants import IS_CPYTHON, IS_PY2
+import gc
+import pytest
+
+
+def _new_code(i):
+    return compile('x = %s' % (i,), '<string>', 'exec')
+
+
+def test_code_object_cache_hits_and_misses():
+    cache = CodeObjectCache()
+    code = _new_code(1)
+    key = (code.co_firstlineno, '<string>', code)
+
+    with pytest.raises(KeyError):
+        cache[key]
+    assert key not in cache
+
+    cache[key] = 'value'
+    assert key in cache
+    assert cache[key] == 'value'
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 1)  # Found in the front dict.
+
+    # Code objects are compared by identity (but equal code objects share the same entry
+    # in the front dict).
+    assert cache.front == {key: 'value'}
+    cache.front.clear()
+    assert (code.co_firstlineno, '<string>', _new_code(1)) not in cache
+    assert cache[key] == 'value'
+    assert cache.front == {key: 'value'}
+    assert (cache.hits, cache.misses) == (2, 1)  # Found in the LRU entries.
+
+    cache.clear()
+    assert len(cache) == 0
+    assert key not in cache
+
+
+@pytest.mark.skipif(IS_PY2, reason='LRU ordering requires OrderedDict.move_to_end.')
+def test_code_object_cache_lru():
+    cache = CodeObjectCache(max_size=2, front_max_size=0)
+    codes = [_new_code(i) for i in range(3)]
+    keys = [(1, '<string>', code) for code in codes]
+
+    cache[keys[0]] = 0
+    cache[keys[1]] = 1
+    assert cache[keys[0]] == 0  # keys[0] is now the most recently used.
+
+    cache[keys[2]] = 2
+    assert len(cache) == 2
+    assert keys[1] not in cache
+    assert cache[keys[0]] == 0
+    assert cache[keys[2]] == 2
+
+
+@pytest.mark.skipif(not IS_CPYTHON or IS_PY2, reason='Requires weak references to code objects.')
+def test_code_object_cache_does_not_keep_code_alive():
+    cache = CodeObjectCache(front_max_size=0)
+    codes = [_new_code(i) for i in range(10)]
+    for i, code in enumerate(codes):
+        cache[(1, '<string>', code)] = i
+        cache[(1, '<string>', True, code)] = i
+
+    assert len(cache) == 20
+    del codes, code
+    gc.collect()
+
+    # The collected entries are removed when the cache is next changed.
+    code = _new_code(100)
+    cache[(1, '<string>', code)] = 100
+    assert len(cache) == 1
+
+
+def test_code_object_cache_front():
+    cache = CodeObjectCache(front_max_size=3)
+    codes = [_new_code(i) for i in range(4)]
+    for i, code in enumerate(codes):
+        cache[(1, '<string>', code)] = i
+
+    # The front dict is cleared when full.
+    assert cache.front == {(1, '<string>', codes[3]): 3}
+    assert len(cache) == 4
+
+    # Entries found in the backing store go back to the front dict.
+    assert cache[(1, '<string>', codes[0])] == 0
+    assert cache.front == {(1, '<string>', codes[3]): 3, (1, '<string>', codes[0]): 0}
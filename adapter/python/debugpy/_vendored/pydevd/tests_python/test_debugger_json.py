@@ -615,6 +615,96 @@ def test_case_json_change_breaks(case_setup):
         writer.finished_ok = True
 
 
+@pytest.mark.skipif(not hasattr(sys, 'monitoring'), reason='sys.monitoring requires Python 3.12 onwards.')
+def test_case_json_sys_monitoring_breakpoint_and_step(case_setup):
+
+    def get_environ(self):
+        env = os.environ.copy()
+        env['PYDEVD_USE_SYS_MONITORING'] = '1'
+        return env
+
+    with case_setup.test_file('_debugger_case_hit_count.py', get_environ=get_environ) as writer:
+        json_facade = JsonFacade(writer)
+
+        json_facade.write_launch()
+        for_line = writer.get_line_index_with_content('for line')
+        print_line = writer.get_line_index_with_content('print line')
+        json_facade.write_set_breakpoints(
+            [print_line],
+            line_to_info={
+                print_line: {'hit_condition': '5'}
+        })
+        json_facade.write_make_initial_run()
+
+        json_hit = json_facade.wait_for_thread_stopped(line=print_line)
+        i_local_var = json_facade.get_local_var(json_hit.frame_id, 'i')  # : :type i_local_var: pydevd_schema.Variable
+        assert i_local_var.value == '4'
+
+        json_facade.write_step_in(json_hit.thread_id)
+        json_hit = json_facade.wait_for_thread_stopped('step', line=for_line)
+
+        json_facade.write_step_in(json_hit.thread_id)
+        json_hit = json_facade.wait_for_thread_stopped('step', line=print_line)
+
+        # Once the breakpoint is removed, the code must run untraced to the end.
+        json_facade.write_set_breakpoints([])
+        json_facade.write_continue()
+
+        writer.finished_ok = True
+
+
+@pytest.mark.skipif(not hasattr(sys, 'monitoring'), reason='sys.monitoring requires Python 3.12 onwards.')
+def test_case_json_sys_monitoring_unhandled_exceptions(case_setup):
+
+    def get_environ(self):
+        env = os.environ.copy()
+        env['PYDEVD_USE_SYS_MONITORING'] = '1'
+        return env
+
+    def check_test_suceeded_msg(writer, stdout, stderr):
+        # Don't call super (we have an unhandled exception in the stack trace).
+        return 'TEST SUCEEDED' in ''.join(stdout) and 'TEST SUCEEDED' in ''.join(stderr)
+
+    def additional_output_checks(writer, stdout, stderr):
+        if 'raise Exception' not in stderr:
+            raise AssertionError('Expected test to have an unhandled exception.\nstdout:\n%s\n\nstderr:\n%s' % (
+                stdout, stderr))
+
+    target_file = '_debugger_case_unhandled_exceptions.py'
+    with case_setup.test_file(
+            target_file,
+            get_environ=get_environ,
+            check_test_suceeded_msg=check_test_suceeded_msg,
+            additional_output_checks=additional_output_checks,
+            EXPECTED_RETURNCODE=1,
+        ) as writer:
+        json_facade = JsonFacade(writer)
+
+        json_facade.write_launch()
+        json_facade.write_set_exception_breakpoints(['uncaught'])
+        json_facade.write_make_initial_run()
+
+        # No code is traced (there are no breakpoints), yet, the uncaught exceptions in the
+        # threads started with thread.start_new_thread/threading and in the main thread
+        # must be reported.
+        line_in_thread1 = writer.get_line_index_with_content('in thread 1')
+        line_in_thread2 = writer.get_line_index_with_content('in thread 2')
+        line_in_main = writer.get_line_index_with_content('in main')
+        json_facade.wait_for_thread_stopped(
+            reason='exception', line=(line_in_thread1, line_in_thread2), file=target_file)
+        json_facade.write_continue()
+
+        json_facade.wait_for_thread_stopped(
+            reason='exception', line=(line_in_thread1, line_in_thread2), file=target_file)
+        json_facade.write_continue()
+
+        json_facade.wait_for_thread_stopped(
+            reason='exception', line=line_in_main, file=target_file)
+        json_facade.write_continue()
+
+        writer.finished_ok = True
+
+
 def test_case_handled_exception_no_break_on_generator(case_setup):
     with case_setup.test_file('_debugger_case_ignore_exceptions.py') as writer:
         json_facade = JsonFacade(writer)
@@ -0,0 +1,67 @@
+'''
+Checks for the adapter of the debugpy which vendors this pydevd.
+'''
+from tests_python.debug_constants import DEBUGPY_PARENT_DIR, TEST_DEBUGPY
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not TEST_DEBUGPY, reason='Requires the debugpy which vendors pydevd.')
+
+# How much longer than starting the interpreter itself the adapter may take to answer the
+# "initialize" request (it's ~0.1s, this is just meant to catch big regressions, such as
+# importing something expensive at startup).
+MAX_INITIALIZE_OVERHEAD = 0.5
+
+RUNS = 3
+
+
+def _time_to_start(args, initialize=False):
+    initial_time = time.time()
+    process = subprocess.Popen(
+        [sys.executable] + args,
+        cwd=DEBUGPY_PARENT_DIR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        if not initialize:
+            process.communicate()
+            return time.time() - initial_time
+
+        body = json.dumps({'seq': 1, 'type': 'request', 'command': 'initialize', 'arguments': {'adapterID': 'test'}}).encode('utf-8')
+        process.stdin.write(b'Content-Length: %d\r\n\r\n' % (len(body),) + body)
+        process.stdin.flush()
+
+        length = None
+        while True:
+            line = process.stdout.readline()
+            assert line, 'The adapter exited before answering "initialize".'
+            line = line.strip()
+            if not line:
+                break
+            name, _, value = line.partition(b':')
+            if name.strip() == b'Content-Length':
+                length = int(value)
+        message = json.loads(process.stdout.read(length).decode('utf-8'))
+        elapsed = time.time() - initial_time
+
+        assert message['type'] == 'response'
+        assert message['command'] == 'initialize'
+        assert message['success']
+        return elapsed
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.communicate()
+
+
+def test_adapter_time_to_initialize():
+    interpreter_time = min(_time_to_start(['-c', 'pass']) for _ in range(RUNS))
+    initialize_time = min(_time_to_start(['-m', 'debugpy.adapter'], initialize=True) for _ in range(RUNS))
+    assert initialize_time - interpreter_time < MAX_INITIALIZE_OVERHEAD, (
+        'Answering "initialize" took %.3fs (starting the interpreter: %.3fs).' % (initialize_time, interpreter_time))
@@ -0,0 +1,246 @@
+'''
+Checks for the DAP messaging of the debugpy which vendors this pydevd.
+'''
+from tests_python.debug_constants import DEBUGPY_PARENT_DIR, TEST_BENCHMARKS, TEST_DEBUGPY
+import socket
+import sys
+import threading
+import time
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not TEST_DEBUGPY, reason='Requires the debugpy which vendors pydevd.')
+
+
+@pytest.fixture
+def messaging():
+    sys.path.insert(0, DEBUGPY_PARENT_DIR)
+    try:
+        from debugpy.common import messaging
+        yield messaging
+    finally:
+        sys.path.remove(DEBUGPY_PARENT_DIR)
+
+
+def _write_messages(sock, messages):
+    # Written in a thread as the messages may not fit in the socket buffers.
+    def write():
+        writer = sock.makefile('wb', 0)
+        for message in messages:
+            body = message.encode('utf-8')
+            writer.write(b'Content-Length: %d\r\n\r\n' % (len(body),) + body)
+        writer.close()
+        sock.shutdown(socket.SHUT_WR)
+
+    t = threading.Thread(target=write)
+    t.daemon = True
+    t.start()
+    return t
+
+
+def _read_all(stream, count):
+    return [stream.read_json() for _ in range(count)]
+
+
+def test_json_io_stream_reads_bodies_of_any_size(messaging):
+    a, b = socket.socketpair()
+    messages = [
+        '{"seq": 1}',
+        '{"seq": 2, "body": "%s"}' % ('x' * messaging.JsonIOStream.READ_BUFFER_SIZE,),
+        '{"seq": 3, "body": "%s"}' % ('y' * messaging.JsonIOStream.MAX_RETAINED_BUFFER_SIZE,),
+        '{"seq": 4, "body": "\\u00e9"}',
+    ]
+    writer_thread = _write_messages(a, messages)
+    stream = messaging.JsonIOStream.from_socket(b, 'test')
+    try:
+        values = _read_all(stream, len(messages))
+        assert [value['seq'] for value in values] == [1, 2, 3, 4]
+        assert len(values[1]['body']) == messaging.JsonIOStream.READ_BUFFER_SIZE
+        assert len(values[2]['body']) == messaging.JsonIOStream.MAX_RETAINED_BUFFER_SIZE
+        assert values[3]['body'] == u'é'
+
+        # Only the buffer of the bodies which aren't too big is kept.
+        assert len(stream._read_buffer) <= messaging.JsonIOStream.MAX_RETAINED_BUFFER_SIZE
+
+        with pytest.raises(messaging.NoMoreMessages):
+            stream.read_json()
+    finally:
+        writer_thread.join()
+        stream.close()
+        a.close()
+
+
+@pytest.mark.skipif(not TEST_BENCHMARKS, reason='Benchmark (set PYDEVD_TEST_BENCHMARKS=YES to run it).')
+@pytest.mark.parametrize('buffered', [True, False])
+def test_json_io_stream_read_benchmark(messaging, buffered):
+    '''
+    Reads many small messages (as the events sent while stepping) and a few big ones (as
+    variables with big values), through the buffered reader of `from_socket()` or an
+    unbuffered one (use `-s` to see the timings).
+    '''
+    messages = ['{"seq": %s, "type": "event", "event": "output", "body": {"output": "line %s\\n"}}' % (i, i) for i in range(20000)]
+    messages += ['{"seq": %s, "type": "response", "body": "%s"}' % (i, 'z' * 1000000) for i in range(20)]
+
+    a, b = socket.socketpair()
+    writer_thread = _write_messages(a, messages)
+    if buffered:
+        stream = messaging.JsonIOStream.from_socket(b, 'test')
+    else:
+        stream = messaging.JsonIOStream(b.makefile('rb', 0), b.makefile('wb', 0), 'test')
+    try:
+        initial_time = time.time()
+        values = _read_all(stream, len(messages))
+        elapsed = time.time() - initial_time
+        assert len(values) == len(messages)
+    finally:
+        writer_thread.join()
+        stream.close()
+        b.close()
+        a.close()
+
+    print('Read %s messages (buffered: %s): %.3fs' % (len(messages), buffered, elapsed))
+
+
+def test_json_validators_are_cached(messaging):
+    from debugpy.common import json
+    from debugpy.common.compat import unicode
+
+    assert json.array(unicode) is json.array(unicode)
+    assert json.enum('a', 'b', optional=True) is json.enum('a', 'b', optional=True)
+    assert json.default(1) is not json.default(True)
+
+    # Ad hoc validators and mutable defaults aren't cached (the cache would grow forever).
+    assert json.array(lambda x: x) is not json.array(lambda x: x)
+    assert json.default([]) is not json.default([])
+
+
+def test_message_dict_memoizes_validated_values(messaging):
+    calls = []
+
+    def validate(value):
+        calls.append(value)
+        return value * 2
+
+    d = messaging.MessageDict(None, {'x': 1})
+    assert d('x', validate) == 2
+    assert d('x', validate) == 2
+    assert calls == [1]
+
+    # Changing the dict forgets the validated values.
+    d['x'] = 2
+    assert d('x', validate) == 4
+    assert calls == [1, 2]
+
+    # Defaults which compare equal aren't mixed up.
+    assert d('y', 1) == 1
+    assert d('y', True) is True
+
+
+@pytest.mark.skipif(not TEST_BENCHMARKS, reason='Benchmark (set PYDEVD_TEST_BENCHMARKS=YES to run it).')
+def test_message_dict_validation_benchmark(messaging):
+    '''
+    Validates the properties of many requests as the adapter does (creating the validators
+    on each access), accessing each one 3 times (use `-s` to see the timings).
+    '''
+    from debugpy.common import json
+    from debugpy.common.compat import unicode
+
+    requests = [
+        messaging.MessageDict(None, {
+            'program': '/project/main.py',
+            'args': ['--foo', 'bar'] * 10,
+            'env': dict(('VAR%s' % (i,), 'value') for i in range(20)),
+            'console': 'internalConsole',
+        }) for _ in range(10000)
+    ]
+
+    initial_time = time.time()
+    for request in requests:
+        for _ in range(3):
+            request('program', unicode)
+            request('args', json.array(unicode))
+            request('env', json.object((unicode, type(None))))
+            request('console', json.enum('internalConsole', 'integratedTerminal', 'externalTerminal', optional=True))
+    elapsed = time.time() - initial_time
+
+    print('Validated %s requests: %.3fs' % (len(requests), elapsed))
+
+
+class _Handlers(object):
+
+    def __init__(self):
+        self.slow_can_return = threading.Event()
+        self.handled = []
+
+    def slow_request(self, request):
+        self.slow_can_return.wait(10)
+        self.handled.append('slow')
+        return {}
+
+    def fast_request(self, request):
+        self.handled.append('fast')
+        return {}
+
+    def ordered_request(self, request):
+        self.handled.append('ordered')
+        return {}
+
+
+def _start_channels(messaging, handlers, concurrent_requests):
+    a, b = socket.socketpair()
+    server = messaging.JsonMessageChannel(messaging.JsonIOStream.from_socket(a, 'server'), handlers)
+    server.concurrent_requests = frozenset(concurrent_requests)
+    server.start()
+    client = messaging.JsonMessageChannel(messaging.JsonIOStream.from_socket(b, 'client'))
+    client.start()
+    return server, client
+
+
+def test_json_message_channel_concurrent_requests(messaging):
+    handlers = _Handlers()
+    server, client = _start_channels(messaging, handlers, ['slow', 'fast'])
+    try:
+        slow = client.send_request('slow')
+        client.request('fast')  # Doesn't wait for 'slow'.
+        ordered = client.send_request('ordered')  # Waits for 'slow'.
+        time.sleep(0.2)
+        assert handlers.handled == ['fast']
+
+        handlers.slow_can_return.set()
+        slow.wait_for_response()
+        ordered.wait_for_response()
+        assert handlers.handled == ['fast', 'slow', 'ordered']
+    finally:
+        handlers.slow_can_return.set()
+        client.close()
+        server.close()
+
+
+@pytest.mark.skipif(not TEST_BENCHMARKS, reason='Benchmark (set PYDEVD_TEST_BENCHMARKS=YES to run it).')
+@pytest.mark.parametrize('concurrent', [True, False])
+def test_json_message_channel_concurrent_requests_benchmark(messaging, concurrent):
+    '''
+    Measures how long fast requests take when queued behind a request whose handler takes
+    200ms, with and without concurrent handlers (use `-s` to see the timings).
+    '''
+    latencies = []
+    for _ in range(5):
+        handlers = _Handlers()
+        server, client = _start_channels(messaging, handlers, ['slow', 'fast'] if concurrent else [])
+        try:
+            client.send_request('slow')
+            threading.Timer(0.2, handlers.slow_can_return.set).start()
+            sent = []
+            for _ in range(20):
+                sent.append((time.time(), client.send_request('fast')))
+            for initial_time, request in sent:
+                request.wait_for_response()
+                latencies.append(time.time() - initial_time)
+        finally:
+            handlers.slow_can_return.set()
+            client.close()
+            server.close()
+
+    latencies.sort()
+    print('Fast requests (concurrent: %s): p50 %.0fms, p99 %.0fms' % (
+        concurrent, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000))
@@ -0,0 +1,79 @@
+import threading
+
+import pytest
+
+from _pydevd_bundle.pydevd_comm_constants import CMD_THREAD_CREATE, CMD_THREAD_KILL
+
+
+class _Writer(object):
+
+    def __init__(self):
+        self.commands = []
+
+    def add_command(self, cmd):
+        self.commands.append(cmd)
+
+    def get_ids(self):
+        return [cmd.id for cmd in self.commands]
+
+
+@pytest.fixture
+def py_db():
+    import pydevd
+    py_db = pydevd.PyDB(set_as_global=False)
+    py_db.writer = _Writer()
+    py_db.set_enable_thread_notifications(True)
+    py_db.ready_to_run = True
+    yield py_db
+    py_db.ready_to_run = False
+
+
+def test_process_internal_commands_threads_tracking(py_db, monkeypatch):
+    import pydevd
+
+    enumerate_calls = []
+
+    def threading_enumerate():
+        enumerate_calls.append(1)
+        return threading.enumerate()
+
+    monkeypatch.setattr(pydevd, 'threadingEnumerate', threading_enumerate)
+
+    py_db.process_internal_commands()
+    assert len(enumerate_calls) == 1
+
+    # No threads were created or finished: no need to enumerate again.
+    py_db.process_internal_commands()
+    py_db.process_internal_commands()
+    assert len(enumerate_calls) == 1
+    del py_db.writer.commands[:]
+
+    # A thread started without the debugger hooks is still noticed.
+    event = threading.Event()
+    t = threading.Thread(target=event.wait)
+    t.start()
+    py_db.process_internal_commands()
+    assert len(enumerate_calls) == 2
+    assert py_db.writer.get_ids() == [CMD_THREAD_CREATE]
+
+    event.set()
+    t.join()
+    py_db.process_internal_commands()
+    assert len(enumerate_calls) == 3
+    assert py_db.writer.get_ids() == [CMD_THREAD_CREATE, CMD_THREAD_KILL]
+
+    # When notifications are enabled again the threads must be notified again.
+    py_db.set_enable_thread_notifications(False)
+    py_db.set_enable_thread_notifications(True)
+    py_db.process_internal_commands()
+    assert len(enumerate_calls) == 4
+
+
+def test_post_internal_command_to_any_thread_wakes_command_thread(py_db):
+    called = []
+    py_db._py_db_command_thread_event.clear()
+    py_db.post_method_as_internal_command('*', lambda py_db: called.append(1))
+    assert py_db._py_db_command_thread_event.is_set()
+
+    py_db.process_internal_commands()
+    assert called == [1]
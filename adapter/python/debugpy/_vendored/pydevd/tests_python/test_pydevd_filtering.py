@@ -1,4 +1,6 @@
 from _pydevd_bundle.pydevd_constants import IS_WINDOWS
+from tests_python.debug_constants import TEST_BENCHMARKS
+import pytest
 
 
 def test_in_project_roots_prefix_01(tmpdir):
@@ -248,3 +250,125 @@ def test_rules_to_exclude_filter(tmpdir):
         ExcludeFilter(name='bar.foo', exclude=False, is_path=False),
         ExcludeFilter(name='bar', exclude=True, is_path=False),
     ]
+
+
+def test_globs_matcher():
+    from _pydevd_bundle.pydevd_filtering import glob_matches_path
+    from _pydevd_bundle.pydevd_filtering import GlobsMatcher
+    import itertools
+
+    globs = [
+        '', '*', '**', '/', '/*', '/**', '**/*', '**/a', '**/d', '**/c/d', '/*/b', '/*/b/*/d',
+        '/a/**/c/*', '/a/**/c/*.py', '/a/**/c/so?.py', '/**/*.py', '**/c/*.py', '**/C/*.py',
+        '/a/b/[cd]/*', '/a/b/[!c]/*', '/a/b/[/*', '/a/b/**/', '/a//b', r'**\d', r'c:\**\d',
+        'c:/a/**', 'd:/a/**', 'c:', '/c:/a/**',
+    ]
+    paths = [
+        '', '/', '/a', '/a/b', '/a/b/c', '/a/b/c/d', '/a/b/c/d.py', '/a/b/c/d.pyx',
+        '/a/b/c/some.py', '/a/b/C/d.py', '/a/b/d/e', '/a/b/[/e', '/a//b', '/a/b/', 'a/b',
+        '/c:/a/b', r'\a\b\c\d',
+    ]
+
+    for sep, altsep in (('\\', '/'), ('/', None)):
+        for glob in globs:
+            matcher = GlobsMatcher([glob], sep, altsep)
+            for path in itertools.chain(paths, [('c:' + p).replace('/', '\\') for p in paths]):
+                expected = glob_matches_path(path, glob, sep, altsep)
+                assert (matcher.match(path) == 0) == expected, \
+                    'Expected %s to match %s: %s (sep: %s)' % (path, glob, expected, sep)
+
+        # The first glob which matches is the one reported (even with more globs than
+        # the ones which fit in a single regular expression).
+        many_globs = ['/x%s/**' % (i,) for i in range(200)] + globs
+        matcher = GlobsMatcher(many_globs, sep, altsep)
+        assert matcher.match('/x150/a.py') == 150
+        for path in paths:
+            expected = None
+            for i, glob in enumerate(many_globs):
+                if glob_matches_path(path, glob, sep, altsep):
+                    expected = i
+                    break
+            assert matcher.match(path) == expected
+
+
+def test_filtering_keeps_rules_order():
+    from _pydevd_bundle.pydevd_filtering import FilesFiltering
+    from _pydevd_bundle.pydevd_filtering import ExcludeFilter
+    files_filtering = FilesFiltering()
+
+    files_filtering.set_exclude_filters([
+        ExcludeFilter('/foo/bar/**', False, True),
+        ExcludeFilter('my_module', True, False),
+        ExcludeFilter('/foo/**', True, True),
+        ExcludeFilter('**/*.py', False, True),
+    ])
+    assert files_filtering.require_module
+    assert files_filtering.exclude_by_filter('/foo/bar/a.py', 'my_module') is False
+    assert files_filtering.exclude_by_filter('/foo/a.py', 'my_module.sub') is True
+    assert files_filtering.exclude_by_filter('/foo/a.py', 'other') is True
+    assert files_filtering.exclude_by_filter('/other/a.py', 'other') is False
+    assert files_filtering.exclude_by_filter('/other/a.txt', 'other') is None
+
+
+@pytest.mark.skipif(not TEST_BENCHMARKS, reason='Benchmark (set PYDEVD_TEST_BENCHMARKS=YES to run it).')
+def test_filtering_benchmark(tmpdir):
+    '''
+    Classifies the files of a big (fake) site-packages tree against a set of rules similar
+    to the ones received from the IDE (use `-s` to see the timings).
+    '''
+    from _pydevd_bundle.pydevd_filtering import FilesFiltering
+    from _pydevd_bundle.pydevd_filtering import ExcludeFilter
+    from _pydevd_bundle.pydevd_filtering import glob_matches_path
+    import os.path
+    import time
+
+    site_packages = str(tmpdir.join('lib', 'python', 'site-packages'))
+    project = str(tmpdir.join('project'))
+
+    filenames = []
+    for i in range(100):
+        package = os.path.join(site_packages, 'package%s' % (i,))
+        for j in range(5):
+            for k in range(10):
+                filenames.append(os.path.join(package, 'sub%s' % (j,), 'module%s.py' % (k,)))
+    for i in range(100):
+        filenames.append(os.path.join(project, 'src', 'module%s.py' % (i,)))
+
+    exclude_filters = [ExcludeFilter(os.path.join(site_packages, 'package%s' % (i,), '**'), i % 2 == 0, True) for i in range(0, 100, 3)]
+    exclude_filters.extend([
+        ExcludeFilter('**/sub3/module1.py', False, True),
+        ExcludeFilter('**/tests/**', True, True),
+        ExcludeFilter('**/*_pb2.py', True, True),
+    ])
+
+    files_filtering = FilesFiltering()
+    files_filtering.set_exclude_filters(exclude_filters)
+    files_filtering.set_project_roots([project, os.path.join(site_packages, 'package5')])
+    files_filtering.set_library_roots([site_packages] + [str(tmpdir.join('lib%s' % (i,))) for i in range(20)])
+
+    def exclude_by_filter_uncompiled(filename):
+        for exclude_filter in exclude_filters:
+            if glob_matches_path(filename, exclude_filter.name):
+                return exclude_filter.exclude
+        return None
+
+    initial_time = time.time()
+    expected = [exclude_by_filter_uncompiled(filename) for filename in filenames]
+    uncompiled_time = time.time() - initial_time
+
+    initial_time = time.time()
+    found = [files_filtering.exclude_by_filter(filename, None) for filename in filenames]
+    compiled_time = time.time() - initial_time
+    assert found == expected
+
+    # Don't account for the time to get the absolute path (it's cached for each file).
+    for filename in filenames:
+        files_filtering._absolute_normalized_path(filename)
+
+    initial_time = time.time()
+    in_project = [files_filtering.in_project_roots(filename) for filename in filenames]
+    in_project_roots_time = time.time() - initial_time
+    assert in_project.count(True) == 150
+
+    print('Classified %s files. Exclude filters: %.3fs (uncompiled: %.3fs). Project roots: %.3fs.' % (
+        len(filenames), compiled_time, uncompiled_time, in_project_roots_time))
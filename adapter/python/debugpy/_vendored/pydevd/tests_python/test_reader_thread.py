@@ -0,0 +1,126 @@
+import json
+import random
+import time
+
+import pytest
+
+from _pydevd_bundle.pydevd_comm import ReaderThread
+
+
+class _PyDB(object):
+
+    dap_messages_listeners = []
+
+
+class _Socket(object):
+    '''
+    Provides the contents of a recorded stream (at most `max_chunk` bytes on each read).
+    '''
+
+    def __init__(self, contents, max_chunk):
+        self._contents = contents
+        self._max_chunk = max_chunk
+        self._pos = 0
+        self.reads = 0
+
+    def _next_chunk(self, size):
+        size = min(size, self._max_chunk, len(self._contents) - self._pos)
+        chunk = self._contents[self._pos:self._pos + size]
+        self._pos += size
+        self.reads += 1
+        return chunk
+
+    def recv(self, size):
+        return self._next_chunk(size)
+
+    def recv_into(self, buffer, nbytes=0):
+        chunk = self._next_chunk(nbytes or len(buffer))
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def _create_reader(sock):
+    received = []
+
+    class PyDevJsonCommandProcessor(object):
+
+        def __init__(self, from_json):
+            pass
+
+        def process_net_command_json(self, py_db, json_contents):
+            received.append(json.loads(json_contents.decode('utf-8')))
+
+    def process_net_command(py_db, cmd_id, seq, text):
+        received.append((cmd_id, seq, text))
+
+    reader = ReaderThread(sock, _PyDB(), PyDevJsonCommandProcessor, process_net_command, terminate_on_socket_close=False)
+    return reader, received
+
+
+def _dap_message(seq, command, arguments):
+    contents = json.dumps({'seq': seq, 'type': 'request', 'command': command, 'arguments': arguments}).encode('utf-8')
+    return b'Content-Length: %d\r\n\r\n' % (len(contents),) + contents
+
+
+def _create_recorded_stream():
+    messages = []
+    stream = [b'501\t1\t1.1\tWINDOWS\tID\n']
+    seq = 0
+    for i in range(20):
+        seq += 1
+        arguments = {
+            'source': {'path': '/project/module%s.py' % (i,)},
+            'breakpoints': [{'line': line, 'condition': 'x == %s' % (line,)} for line in range(1, 2000)],
+        }
+        messages.append(('setBreakpoints', arguments))
+        stream.append(_dap_message(seq, 'setBreakpoints', arguments))
+
+        for j in range(50):
+            seq += 1
+            arguments = {'expression': 'a[%s]' % (j,), 'frameId': 1, 'context': 'watch'}
+            messages.append(('evaluate', arguments))
+            stream.append(_dap_message(seq, 'evaluate', arguments))
+
+        seq += 1
+        arguments = {'expression': 'x', 'value': repr(list(range(20000))), 'frameId': 1}
+        messages.append(('setExpression', arguments))
+        stream.append(_dap_message(seq, 'setExpression', arguments))
+    return messages, b''.join(stream)
+
+
+@pytest.mark.parametrize('max_chunk', [1, 7, 1024, 64 * 1024, 1024 * 1024])
+def test_reader_thread_recorded_stream(max_chunk):
+    if max_chunk == 1:
+        # Reading byte by byte is too slow for the whole stream.
+        stream = b''.join(_dap_message(i, 'evaluate', {'expression': 'a' * i}) for i in range(100))
+        expected = [('evaluate', {'expression': 'a' * i}) for i in range(100)]
+    else:
+        expected, stream = _create_recorded_stream()
+        expected.insert(0, (501, 1, u'1.1\tWINDOWS\tID'))
+
+    sock = _Socket(stream, max_chunk)
+    reader, received = _create_reader(sock)
+
+    initial_time = time.time()
+    reader._on_run()  # Finishes when the whole stream is read.
+    elapsed = time.time() - initial_time
+
+    assert [
+        msg if isinstance(msg, tuple) else (msg['command'], msg['arguments']) for msg in received
+    ] == expected
+    print('Parsed %s messages (%.1f MB) in %.3fs with %s reads (max chunk: %s).' % (
+        len(received), len(stream) / (1024. * 1024.), elapsed, sock.reads, max_chunk))
+
+
+def test_reader_thread_random_chunks():
+    random.seed(0)
+    stream = b''.join(_dap_message(i, 'evaluate', {'expression': 'a' * random.randint(0, 100000)}) for i in range(200))
+
+    class RandomChunksSocket(_Socket):
+
+        def _next_chunk(self, size):
+            return _Socket._next_chunk(self, random.randint(1, max(1, size)))
+
+    reader, received = _create_reader(RandomChunksSocket(stream, 1024 * 1024))
+    reader._on_run()
+    assert [msg['seq'] for msg in received] == list(range(200))
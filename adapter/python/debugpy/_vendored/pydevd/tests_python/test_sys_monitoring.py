@@ -0,0 +1,43 @@
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(sys, 'monitoring'), reason='sys.monitoring requires Python 3.12 onwards.')
+
+
+@pytest.fixture
+def tracer():
+    import pydevd
+    from _pydevd_bundle.pydevd_sys_monitoring import SysMonitoringTracer
+    py_db = pydevd.PyDB(set_as_global=False)
+    tracer = SysMonitoringTracer(py_db)
+    if not tracer.start():
+        pytest.skip('sys.monitoring debugger tool id already in use.')
+    try:
+        yield tracer
+    finally:
+        tracer.stop()
+
+
+def _global_events():
+    return sys.monitoring.get_events(sys.monitoring.DEBUGGER_ID)
+
+
+def test_sys_monitoring_exception_events(tracer):
+    events = sys.monitoring.events
+    py_db = tracer.py_db
+    assert _global_events() == events.PY_START | events.PY_RESUME
+
+    # Uncaught exceptions only need to know when an exception leaves a frame (the
+    # exceptions which are raised and handled in the same frame don't get to the debugger).
+    py_db.add_break_on_exception('BaseException', None, None, False, True, False, False)
+    tracer.update()
+    assert _global_events() == events.PY_START | events.PY_RESUME | events.PY_UNWIND
+
+    py_db.add_break_on_exception('ValueError', None, None, True, False, False, False)
+    tracer.update()
+    assert _global_events() == events.PY_START | events.PY_RESUME | events.RAISE | events.PY_UNWIND
+
+    py_db.break_on_caught_exceptions = {}
+    tracer.update()
+    assert _global_events() == events.PY_START | events.PY_RESUME | events.PY_UNWIND
@@ -11,6 +11,7 @@ import json
 import locale
 import os
 import sys
+import time
 
 # WARNING: debugpy and submodules must not be imported on top level in this module,
 # and should be imported locally inside main() instead.
@@ -27,6 +28,12 @@ def main(args):
         sys.stderr = stderr = open(os.devnull, "w")
         atexit.register(stderr.close)
 
+    # Components that aren't needed until later, such as launchers, are imported
+    # lazily by the modules that use them, to keep the time to first message short.
+    import_timer = None
+    if args.log_stderr or args.log_dir is not None or os.getenv("DEBUGPY_LOG_DIR"):
+        import_timer = _ImportTimer.install()
+
     from debugpy import adapter
     from debugpy.common import compat, log, sockets
     from debugpy.adapter import clients, servers, sessions
@@ -51,6 +58,9 @@ def main(args):
 
     log.to_file(prefix="debugpy.adapter")
     log.describe_environment("debugpy.adapter startup environment:")
+    if import_timer is not None:
+        import_timer.uninstall()
+        import_timer.report()
 
     servers.access_token = args.server_access_token
     if args.for_server is None:
@@ -122,6 +132,17 @@ def main(args):
     if args.port is None:
         clients.Client("stdio")
 
+    # This must be done after stdio is redirected for the client above, since the
+    # launchers inherit it.
+    warm_launchers = os.getenv("DEBUGPY_WARM_LAUNCHERS")
+    if warm_launchers and args.for_server is None:
+        from debugpy import launcher
+        from debugpy.adapter import launchers
+
+        launchers.start_warm_launchers(
+            warm_launchers.split(os.pathsep), os.path.dirname(launcher.__file__)
+        )
+
     # These must be registered after the one above, to ensure that the listener sockets
     # are closed before the endpoint info file is deleted - this way, another process
     # can wait for the file to go away as a signal that the ports are no longer in use.
@@ -135,6 +156,101 @@ def main(args):
     log.info("All debug sessions have ended; exiting.")
 
 
+class _ImportTimer(object):
+    """Measures how long every module imported while it's installed took to load,
+    and reports it in the log, in a format similar to "python -X importtime".
+    """
+
+    def __init__(self):
+        self.timings = []  # [(module name, self us, cumulative us, depth)]
+        self._depth = 0
+
+    @classmethod
+    def install(cls):
+        if sys.version_info < (3, 4):
+            return None
+        timer = cls()
+        sys.meta_path.insert(0, timer)
+        return timer
+
+    def uninstall(self):
+        try:
+            sys.meta_path.remove(self)
+        except ValueError:
+            pass
+
+    def find_spec(self, fullname, path=None, target=None):
+        import importlib.util
+
+        # Let the other finders locate the module, and only wrap its loader.
+        sys.meta_path.remove(self)
+        try:
+            spec = importlib.util.find_spec(fullname)
+        except Exception:
+            spec = None
+        finally:
+            sys.meta_path.insert(0, self)
+
+        if spec is None or not hasattr(spec.loader, "exec_module"):
+            return None
+        spec.loader = _TimedLoader(self, spec.loader)
+        return spec
+
+    def report(self, limit=20):
+        from debugpy.common import log
+
+        if not self.timings:
+            return
+
+        total = sum(cumulative for _, _, cumulative, depth in self.timings if not depth)
+        lines = [
+            "{0:>10} | {1:>10} | {2}{3}".format(self_us, cumulative, "  " * depth, name)
+            for name, self_us, cumulative, depth in self.timings
+        ]
+        slowest = sorted(self.timings, key=lambda t: t[1], reverse=True)[:limit]
+        log.info(
+            "Imported {0} modules in {1} us.\n\nimport time: self [us] | "
+            "cumulative | imported package\n{2}\n\nSlowest by self time:\n{3}",
+            len(self.timings),
+            total,
+            "\n".join(lines),
+            "\n".join("{0:>10} us  {1}".format(t[1], t[0]) for t in slowest),
+        )
+
+
+class _TimedLoader(object):
+    def __init__(self, timer, loader):
+        self._timer = timer
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        timer = self._timer
+        index = len(timer.timings)
+        timer.timings.append(None)
+        timer._depth += 1
+        start = time.time()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            timer._depth -= 1
+            cumulative = int((time.time() - start) * 1000000)
+            nested = sum(
+                t[2] for t in timer.timings[index + 1 :] if t[3] == timer._depth + 1
+            )
+            timer.timings[index] = (
+                module.__name__,
+                cumulative - nested,
+                cumulative,
+                timer._depth,
+            )
+
+
 def _parse_argv(argv):
     parser = argparse.ArgumentParser()
 
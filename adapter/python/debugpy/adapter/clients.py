@@ -36,6 +36,22 @@ class Client(components.Component):
             "pathFormat": json.enum("path", optional=True),  # we don't support "uri"
         }
 
+    # Requests that only inspect the debuggee, and are simply delegated to the
+    # server, so that a slow one doesn't hold up the others.
+    concurrent_requests = frozenset(
+        [
+            "completions",
+            "exceptionInfo",
+            "loadedSources",
+            "modules",
+            "scopes",
+            "source",
+            "stackTrace",
+            "threads",
+            "variables",
+        ]
+    )
+
     def __init__(self, sock):
         if sock == "stdio":
             log.info("Connecting to client over stdio...", self)
@@ -130,7 +146,15 @@ class Client(components.Component):
     # Generic request handler, used if there's no specific handler below.
     @message_handler
     def request(self, request):
-        return self.server.channel.delegate(request)
+        if request.command not in self.concurrent_requests:
+            # Other requests (e.g. "setBreakpoints", "continue") must stay ordered
+            # with respect to the other handlers, so the session stays locked.
+            return self.server.channel.delegate(request)
+
+        propagated_request = self.server.channel.propagate(request)
+        # Don't keep handlers for other components waiting on the server's response.
+        with self.session.unlocked():
+            return propagated_request.wait_for_response()
 
     @message_handler
     def initialize_request(self, request):
@@ -35,6 +35,11 @@ class Component(util.Observable):
     to wait_for() a change caused by another component.
     """
 
+    concurrent_requests = frozenset()
+    """Requests that the channel can handle concurrently, if it is created by the
+    component. See JsonMessageChannel.concurrent_requests.
+    """
+
     def __init__(self, session, stream=None, channel=None):
         assert (stream is None) ^ (channel is None)
 
@@ -51,6 +56,7 @@ class Component(util.Observable):
         if channel is None:
             stream.name = str(self)
             channel = messaging.JsonMessageChannel(stream, self)
+            channel.concurrent_requests = self.concurrent_requests
             channel.start()
         else:
             channel.name = channel.stream.name = str(self)
@@ -59,7 +65,7 @@ class Component(util.Observable):
         self.is_connected = True
 
         # Do this last to avoid triggering useless notifications for assignments above.
-        self.observers += [lambda *_: self.session.notify_changed()]
+        self.observers += [lambda _, name: self.session.notify_changed(name)]
 
     def __str__(self):
         return fmt("{0}[{1}]", type(self).__name__, self.session.id)
@@ -7,6 +7,8 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import os
 import subprocess
 import sys
+import threading
+import time
 
 from debugpy import adapter, common
 from debugpy.common import compat, fmt, log, messaging, sockets
@@ -65,6 +67,124 @@ class Launcher(components.Component):
                     pass
 
 
+_warm_launchers_lock = threading.Lock()
+_warm_launchers = []  # [_WarmLauncher]
+
+
+class _WarmLauncher(object):
+    """A launcher process that was started ahead of time, and is either connecting
+    or connected to the adapter, but isn't used by any session yet.
+    """
+
+    def __init__(self, adapter_host, cmdline, env):
+        self.key = (adapter_host,) + tuple(cmdline)
+        self.stream = None
+        self.process = None
+        self.connected = threading.Event()
+        self._listener = sockets.serve(
+            "Launcher", self._on_connected, adapter_host, backlog=1
+        )
+        try:
+            self.process = _popen(
+                cmdline + [_launcher_addr(self._listener), "--warm", "--"], None, env
+            )
+        except Exception:
+            self._listener.close()
+            raise
+
+    def _on_connected(self, sock):
+        self._listener.close()
+        self.stream = messaging.JsonIOStream.from_socket(sock)
+        self.connected.set()
+
+    def wait_until_connected(self):
+        """Returns the stream once the launcher connects, or None if it exits or times
+        out before that. Still faster than starting a new launcher from scratch.
+        """
+        deadline = time.time() + common.PROCESS_SPAWN_TIMEOUT
+        while not self.connected.wait(0.1):
+            if self.process.poll() is not None or time.time() > deadline:
+                return None
+        return self.stream
+
+    def discard(self):
+        self._listener.close()
+        if self.stream is not None:
+            # The launcher exits once the adapter disconnects.
+            self.stream.close()
+        elif self.process.poll() is None:
+            self.process.kill()
+
+
+def start_warm_launchers(pythons, launcher_path, adapter_host="127.0.0.1"):
+    """Starts a launcher for every interpreter in pythons ahead of time, so that a
+    "launch" request that uses one of them with "internalConsole" doesn't have to
+    wait for the launcher to start up and connect.
+
+    Whichever launchers aren't used by the first "launch" request are discarded, since
+    an adapter handles only one.
+    """
+
+    for python in pythons:
+        cmdline = [compat.filename_str(python), compat.filename_str(launcher_path)]
+        log.info("Starting launcher ahead of time: {0!r}", cmdline)
+        try:
+            launcher = _WarmLauncher(adapter_host, cmdline, _launcher_env())
+        except Exception:
+            log.swallow_exception("Failed to start launcher ahead of time:")
+            continue
+        with _warm_launchers_lock:
+            _warm_launchers.append(launcher)
+
+
+def _take_warm_launcher(adapter_host, cmdline):
+    """Returns the stream for a connected warm launcher that runs cmdline, or None if
+    there's none. Discards all other warm launchers.
+    """
+
+    key = (adapter_host,) + tuple(cmdline)
+    with _warm_launchers_lock:
+        launchers = _warm_launchers[:]
+        del _warm_launchers[:]
+
+    stream = None
+    for launcher in launchers:
+        if stream is None and launcher.key == key:
+            stream = launcher.wait_until_connected()
+            if stream is not None:
+                continue
+        launcher.discard()
+    return stream
+
+
+def _launcher_addr(listener):
+    host, port = listener.getsockname()
+    return str(port if host == "127.0.0.1" else fmt("{0}:{1}", host, port))
+
+
+def _launcher_env():
+    env = {}
+    if log.log_dir is not None:
+        env[str("DEBUGPY_LOG_DIR")] = compat.filename_str(log.log_dir)
+    if log.stderr.levels != {"warning", "error"}:
+        env[str("DEBUGPY_LOG_STDERR")] = str(" ".join(log.stderr.levels))
+    return env
+
+
+def _popen(cmdline, cwd, env):
+    # If we are talking to the client over stdio, sys.stdin and sys.stdout are
+    # redirected to avoid mangling the DAP message stream. Make sure the launcher
+    # also respects that.
+    return subprocess.Popen(
+        cmdline,
+        cwd=cwd,
+        env=dict(list(os.environ.items()) + list(env.items())),
+        stdin=sys.stdin,
+        stdout=sys.stdout,
+        stderr=sys.stderr,
+    )
+
+
 def spawn_debuggee(
     session,
     start_request,
@@ -82,13 +202,37 @@ def spawn_debuggee(
     cmdline = ["sudo", "-E"] if sudo else []
     cmdline += python
     cmdline += [launcher_path]
-    env = {}
+    env = _launcher_env()
 
     arguments = dict(start_request.arguments)
     if not session.no_debug:
         _, arguments["port"] = servers.listener.getsockname()
         arguments["adapterAccessToken"] = adapter.access_token
 
+    warm_stream = None
+    if console == "internalConsole" and not sudo:
+        try:
+            warm_cmdline = [compat.filename_str(arg) for arg in cmdline]
+        except UnicodeEncodeError:
+            pass  # reported below, when spawning the launcher
+        else:
+            warm_stream = _take_warm_launcher(adapter_host, warm_cmdline)
+
+        if warm_stream is not None:
+            log.info("{0} using launcher started ahead of time.", session)
+            launcher = Launcher(session, warm_stream)
+            # The launcher is already running, so it gets what would normally be on
+            # its command line, and its working directory, in a request of its own.
+            # It handles requests in order, and refuses to launch if this one failed,
+            # so there's no need to wait for the response (which would also cost a
+            # round trip).
+            command_line = {"args": list(args)}
+            if cwd is not None:
+                command_line["cwd"] = cwd
+            launcher.channel.send_request("setCommandLine", command_line)
+            _start(session, start_request, arguments, sudo)
+            return
+
     def on_launcher_connected(sock):
         listener.close()
         stream = messaging.JsonIOStream.from_socket(sock)
@@ -104,20 +248,9 @@ def spawn_debuggee(
         )
 
     try:
-        launcher_host, launcher_port = listener.getsockname()
-        launcher_addr = (
-            launcher_port
-            if launcher_host == "127.0.0.1"
-            else fmt("{0}:{1}", launcher_host, launcher_port)
-        )
-        cmdline += [str(launcher_addr), "--"]
+        cmdline += [_launcher_addr(listener), "--"]
         cmdline += args
 
-        if log.log_dir is not None:
-            env[str("DEBUGPY_LOG_DIR")] = compat.filename_str(log.log_dir)
-        if log.stderr.levels != {"warning", "error"}:
-            env[str("DEBUGPY_LOG_STDERR")] = str(" ".join(log.stderr.levels))
-
         if console == "internalConsole":
             log.info("{0} spawning launcher: {1!r}", session, cmdline)
             try:
@@ -129,17 +262,7 @@ def spawn_debuggee(
                             "Invalid command line argument {0!j}: {1}", arg, exc
                         )
 
-                # If we are talking to the client over stdio, sys.stdin and sys.stdout
-                # are redirected to avoid mangling the DAP message stream. Make sure
-                # the launcher also respects that.
-                subprocess.Popen(
-                    cmdline,
-                    cwd=cwd,
-                    env=dict(list(os.environ.items()) + list(env.items())),
-                    stdin=sys.stdin,
-                    stdout=sys.stdout,
-                    stderr=sys.stderr,
-                )
+                _popen(cmdline, cwd, env)
             except Exception as exc:
                 raise start_request.cant_handle("Failed to spawn launcher: {0}", exc)
         else:
@@ -159,38 +282,46 @@ def spawn_debuggee(
             except messaging.MessageHandlingError as exc:
                 exc.propagate(start_request)
 
-        # If using sudo, it might prompt for password, and launcher won't start running
-        # until the user enters it, so don't apply timeout in that case.
-        if not session.wait_for(
-            lambda: session.launcher,
-            timeout=(None if sudo else common.PROCESS_SPAWN_TIMEOUT),
-        ):
-            raise start_request.cant_handle("Timed out waiting for launcher to connect")
+        _start(session, start_request, arguments, sudo)
 
-        try:
-            session.launcher.channel.request(start_request.command, arguments)
-        except messaging.MessageHandlingError as exc:
-            exc.propagate(start_request)
-
-        if not session.wait_for(
-            lambda: session.launcher.pid is not None,
-            timeout=common.PROCESS_SPAWN_TIMEOUT,
-        ):
-            raise start_request.cant_handle(
-                'Timed out waiting for "process" event from launcher'
-            )
+    finally:
+        listener.close()
 
-        if session.no_debug:
-            return
 
-        # Wait for the first incoming connection regardless of the PID - it won't
-        # necessarily match due to the use of stubs like py.exe or "conda run".
-        conn = servers.wait_for_connection(
-            session, lambda conn: True, timeout=common.PROCESS_SPAWN_TIMEOUT
+def _start(session, start_request, arguments, sudo):
+    """Waits for the launcher to connect, and has it spawn the debuggee."""
+
+    # If using sudo, it might prompt for password, and launcher won't start running
+    # until the user enters it, so don't apply timeout in that case.
+    if not session.wait_for(
+        lambda: session.launcher,
+        timeout=(None if sudo else common.PROCESS_SPAWN_TIMEOUT),
+        depends_on=["launcher"],
+    ):
+        raise start_request.cant_handle("Timed out waiting for launcher to connect")
+
+    try:
+        session.launcher.channel.request(start_request.command, arguments)
+    except messaging.MessageHandlingError as exc:
+        exc.propagate(start_request)
+
+    if not session.wait_for(
+        lambda: session.launcher.pid is not None,
+        timeout=common.PROCESS_SPAWN_TIMEOUT,
+        depends_on=["pid"],
+    ):
+        raise start_request.cant_handle(
+            'Timed out waiting for "process" event from launcher'
         )
-        if conn is None:
-            raise start_request.cant_handle("Timed out waiting for debuggee to spawn")
-        conn.attach_to_session(session)
 
-    finally:
-        listener.close()
+    if session.no_debug:
+        return
+
+    # Wait for the first incoming connection regardless of the PID - it won't
+    # necessarily match due to the use of stubs like py.exe or "conda run".
+    conn = servers.wait_for_connection(
+        session, lambda conn: True, timeout=common.PROCESS_SPAWN_TIMEOUT
+    )
+    if conn is None:
+        raise start_request.cant_handle("Timed out waiting for debuggee to spawn")
+    conn.attach_to_session(session)
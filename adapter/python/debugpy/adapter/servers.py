@@ -5,7 +5,6 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import os
-import subprocess
 import sys
 import threading
 import time
@@ -27,6 +26,10 @@ _connections = []
 
 _connections_changed = threading.Event()
 
+_pending_connections = 0
+"""Number of incoming server connections that are still being set up.
+"""
+
 
 class Connection(object):
     """A debug server that is connected to the adapter.
@@ -54,36 +57,26 @@ class Connection(object):
         self.channel = messaging.JsonMessageChannel(stream, self)
         self.channel.start()
 
-        try:
-            self.authenticate()
-            info = self.channel.request("pydevdSystemInfo")
-            process_info = info("process", json.object())
-            self.pid = process_info("pid", int)
-            self.ppid = process_info("ppid", int, optional=True)
-            if self.ppid == ():
-                self.ppid = None
-            self.channel.name = stream.name = str(self)
-
-            debugpy_dir = os.path.dirname(os.path.dirname(debugpy.__file__))
-            # Note: we must check if 'debugpy' is not already in sys.modules because the
-            # evaluation of an import at the wrong time could deadlock Python due to
-            # its import lock.
-            #
-            # So, in general this evaluation shouldn't do anything. It's only
-            # important when pydevd attaches automatically to a subprocess. In this
-            # case, we have to make sure that debugpy is properly put back in the game
-            # for users to be able to use it.v
-            #
-            # In this case (when the import is needed), this evaluation *must* be done
-            # before the configurationDone request is sent -- if this is not respected
-            # it's possible that pydevd already started secondary threads to handle
-            # commands, in which case it's very likely that this command would be
-            # evaluated at the wrong thread and the import could potentially deadlock
-            # the program.
-            #
-            # Note 2: the sys module is guaranteed to be in the frame globals and
-            # doesn't need to be imported.
-            inject_debugpy = """
+        debugpy_dir = os.path.dirname(os.path.dirname(debugpy.__file__))
+        # Note: we must check if 'debugpy' is not already in sys.modules because the
+        # evaluation of an import at the wrong time could deadlock Python due to
+        # its import lock.
+        #
+        # So, in general this evaluation shouldn't do anything. It's only
+        # important when pydevd attaches automatically to a subprocess. In this
+        # case, we have to make sure that debugpy is properly put back in the game
+        # for users to be able to use it.v
+        #
+        # In this case (when the import is needed), this evaluation *must* be done
+        # before the configurationDone request is sent -- if this is not respected
+        # it's possible that pydevd already started secondary threads to handle
+        # commands, in which case it's very likely that this command would be
+        # evaluated at the wrong thread and the import could potentially deadlock
+        # the program.
+        #
+        # Note 2: the sys module is guaranteed to be in the frame globals and
+        # doesn't need to be imported.
+        inject_debugpy = """
 if 'debugpy' not in sys.modules:
     sys.path.insert(0, {debugpy_dir!r})
     try:
@@ -91,10 +84,29 @@ if 'debugpy' not in sys.modules:
     finally:
         del sys.path[0]
 """
-            inject_debugpy = fmt(inject_debugpy, debugpy_dir=debugpy_dir)
+        inject_debugpy = fmt(inject_debugpy, debugpy_dir=debugpy_dir)
+
+        try:
+            # The server handles requests in order, so send the whole handshake at
+            # once, and only then wait for the responses - this way, it costs a single
+            # round trip rather than one per request.
+            auth_request = self._send_authorize()
+            info_request = self.channel.send_request("pydevdSystemInfo")
+            inject_request = self.channel.send_request(
+                "evaluate", {"expression": inject_debugpy}
+            )
+
+            self._check_authorized(auth_request)
+            info = info_request.wait_for_response()
+            process_info = info("process", json.object())
+            self.pid = process_info("pid", int)
+            self.ppid = process_info("ppid", int, optional=True)
+            if self.ppid == ():
+                self.ppid = None
+            self.channel.name = stream.name = str(self)
 
             try:
-                self.channel.request("evaluate", {"expression": inject_debugpy})
+                inject_request.wait_for_response()
             except messaging.MessageHandlingError:
                 # Failure to inject is not a fatal error - such a subprocess can
                 # still be debugged, it just won't support "import debugpy" in user
@@ -172,11 +184,22 @@ if 'debugpy' not in sys.modules:
         return "Server" + fmt("[?]" if self.pid is None else "[pid={0}]", self.pid)
 
     def authenticate(self):
+        self._check_authorized(self._send_authorize())
+
+    def _send_authorize(self):
+        """Sends the "pydevdAuthorize" request, if needed, without waiting for the
+        response. Returns the OutgoingRequest, or None if it wasn't sent.
+        """
         if access_token is None and adapter.access_token is None:
-            return
-        auth = self.channel.request(
+            return None
+        return self.channel.send_request(
             "pydevdAuthorize", {"debugServerAccessToken": access_token}
         )
+
+    def _check_authorized(self, auth_request):
+        if auth_request is None:
+            return
+        auth = auth_request.wait_for_response()
         if auth["clientAccessToken"] != adapter.access_token:
             self.channel.close()
             raise RuntimeError('Mismatched "clientAccessToken"; server not authorized.')
@@ -370,10 +393,32 @@ class Server(components.Component):
 
 def serve(host="127.0.0.1", port=0):
     global listener
-    listener = sockets.serve("Server", Connection, host, port)
+    listener = sockets.serve("Server", _accept, host, port)
     return listener.getsockname()
 
 
+def _accept(sock):
+    # Setting up a Connection takes a round trip to the server, so do it on a thread
+    # of its own - this way, when many subprocesses connect at once, their handshakes
+    # don't have to wait on each other.
+    global _pending_connections
+
+    def setup():
+        global _pending_connections
+        try:
+            Connection(sock)
+        finally:
+            with _lock:
+                _pending_connections -= 1
+                _connections_changed.set()
+
+    with _lock:
+        _pending_connections += 1
+    thread = threading.Thread(target=setup, name="servers.Connection() setup")
+    thread.daemon = True
+    thread.start()
+
+
 def stop_serving():
     try:
         listener.close()
@@ -424,13 +469,14 @@ def wait_until_disconnected():
     """Blocks until all debug servers disconnect from the adapter.
 
     If there are no server connections, waits until at least one is established first,
-    before waiting for it to disconnect.
+    before waiting for it to disconnect. Connections that are still being set up are
+    waited for as well.
     """
     while True:
         _connections_changed.wait()
         with _lock:
             _connections_changed.clear()
-            if not len(_connections):
+            if not len(_connections) and not _pending_connections:
                 return
 
 
@@ -457,6 +503,8 @@ def inject(pid, debugpy_args):
     cmdline += ["--pid", str(pid)]
 
     log.info("Spawning attach-to-PID debugger injector: {0!r}", cmdline)
+    import subprocess
+
     try:
         injector = subprocess.Popen(
             cmdline,
@@ -4,21 +4,31 @@
 
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import contextlib
+import heapq
 import itertools
 import os
 import signal
 import threading
-import time
 
 from debugpy import common
-from debugpy.common import fmt, log, util
-from debugpy.adapter import components, launchers, servers
+from debugpy.common import fmt, log, timestamp, util
+from debugpy.adapter import components, servers
 
 
 _lock = threading.RLock()
 _sessions = set()
 _sessions_changed = threading.Event()
 
+_timers = []
+"""Heap of (deadline, seq, callback) for all pending Session.wait_for() timeouts,
+which are all handled by a single thread.
+"""
+
+_timers_changed = threading.Condition()
+_timers_seq = itertools.count()
+_timer_thread = None
+
 
 class Session(util.Observable):
     """A debug session involving a client, an adapter, a launcher, and a debug server.
@@ -30,13 +40,13 @@ class Session(util.Observable):
     _counter = itertools.count(1)
 
     def __init__(self):
-        from debugpy.adapter import clients
+        from debugpy.adapter import clients, launchers
 
         super(Session, self).__init__()
 
         self.lock = threading.RLock()
         self.id = next(self._counter)
-        self._changed_condition = threading.Condition(self.lock)
+        self._waiters = set()
 
         self.client = components.missing(self, clients.Client)
         """The client component. Always present."""
@@ -63,7 +73,7 @@ class Session(util.Observable):
         self.is_finalizing = False
         """Whether finalize() has been invoked."""
 
-        self.observers += [lambda *_: self.notify_changed()]
+        self.observers += [lambda _, name: self.notify_changed(name)]
 
     def __str__(self):
         return fmt("Session[{0}]", self.id)
@@ -77,14 +87,35 @@ class Session(util.Observable):
         """Unlock the session."""
         self.lock.release()
 
+    @contextlib.contextmanager
+    def unlocked(self):
+        """Temporarily unlock the session that is locked by the current thread, so
+        that message handlers on other threads can run in the meantime.
+        """
+        self.lock.release()
+        try:
+            yield
+        finally:
+            self.lock.acquire()
+
     def register(self):
         with _lock:
             _sessions.add(self)
             _sessions_changed.set()
 
-    def notify_changed(self):
+    def notify_changed(self, name=None):
+        """Reports that the attribute with the specified name of either self,
+        self.client, self.server, or self.launcher has changed, waking up those
+        wait_for() calls that depend on it.
+
+        If name is None, wakes up all wait_for() calls.
+        """
+
         with self:
-            self._changed_condition.notify_all()
+            for waiter in self._waiters:
+                depends_on = waiter.depends_on
+                if name is None or depends_on is None or name in depends_on:
+                    waiter.condition.notify()
 
         # A session is considered ended once all components disconnect, and there
         # are no further incoming messages from anything to handle.
@@ -96,7 +127,7 @@ class Session(util.Observable):
                     _sessions.remove(self)
                     _sessions_changed.set()
 
-    def wait_for(self, predicate, timeout=None):
+    def wait_for(self, predicate, timeout=None, depends_on=None):
         """Waits until predicate() becomes true.
 
         The predicate is invoked with the session locked. If satisfied, the method
@@ -105,6 +136,10 @@ class Session(util.Observable):
         self.client, self.server, or self.launcher to change. On every change, session
         is re-locked and predicate is re-evaluated, until it is satisfied.
 
+        If depends_on is not None, it is the names of the attributes that predicate()
+        depends on, and only changes to attributes with those names cause it to be
+        re-evaluated.
+
         While the session is unlocked, message handlers for components other than
         the one that is waiting can run, but message handlers for that one are still
         blocked.
@@ -114,25 +149,26 @@ class Session(util.Observable):
         False if it timed out, and True otherwise.
         """
 
-        def wait_for_timeout():
-            time.sleep(timeout)
-            wait_for_timeout.timed_out = True
-            self.notify_changed()
-
-        wait_for_timeout.timed_out = False
-        if timeout is not None:
-            thread = threading.Thread(
-                target=wait_for_timeout, name="Session.wait_for() timeout"
-            )
-            thread.daemon = True
-            thread.start()
-
         with self:
-            while not predicate():
-                if wait_for_timeout.timed_out:
-                    return False
-                self._changed_condition.wait()
-            return True
+            if predicate():
+                return True
+
+            waiter = _Waiter(self, depends_on)
+            self._waiters.add(waiter)
+            timer = None
+            try:
+                if timeout is not None:
+                    timer = _schedule(timeout, waiter.time_out)
+                while not predicate():
+                    if waiter.timed_out:
+                        return False
+                    waiter.condition.wait()
+                return True
+            finally:
+                waiter.done = True
+                self._waiters.remove(waiter)
+                if timer is not None:
+                    _cancel(timer)
 
     def finalize(self, why, terminate_debuggee=None):
         """Finalizes the debug session.
@@ -200,6 +236,7 @@ class Session(util.Observable):
                 if not self.wait_for(
                     lambda: self.launcher.exit_code is not None,
                     timeout=common.PROCESS_EXIT_TIMEOUT,
+                    depends_on=["exit_code"],
                 ):
                     log.warning('{0} timed out waiting for "exited" event.', self)
 
@@ -212,7 +249,9 @@ class Session(util.Observable):
             # here, because the final "terminated" event will only come after reading
             # user input in wait-on-exit scenarios.
             log.info("{0} waiting for {1} to disconnect...", self, self.launcher)
-            self.wait_for(lambda: not self.launcher.is_connected)
+            self.wait_for(
+                lambda: not self.launcher.is_connected, depends_on=["is_connected"]
+            )
 
             try:
                 self.launcher.channel.close()
@@ -259,6 +298,83 @@ class Session(util.Observable):
                         pids_killed.add(conn.pid)
 
 
+class _Waiter(object):
+    """A pending Session.wait_for() call."""
+
+    def __init__(self, session, depends_on):
+        self.session = session
+        self.depends_on = None if depends_on is None else frozenset(depends_on)
+        self.condition = threading.Condition(session.lock)
+        self.timed_out = False
+        self.done = False
+
+    def time_out(self):
+        if self.done:
+            return
+        # Don't hold up the other timeouts while some message handler has the session
+        # locked - try again a bit later instead.
+        if not self.session.lock.acquire(False):
+            _schedule(0.01, self.time_out)
+            return
+        try:
+            if self.done:
+                return
+            self.timed_out = True
+            self.condition.notify()
+        finally:
+            self.session.lock.release()
+
+
+def _schedule(timeout, callback):
+    """Invokes callback() on the timer thread after timeout seconds.
+
+    Returns the timer, which can be passed to _cancel().
+    """
+
+    global _timer_thread
+
+    timer = (timestamp.current() + timeout, next(_timers_seq), callback)
+    with _timers_changed:
+        heapq.heappush(_timers, timer)
+        _timers_changed.notify()
+
+        if _timer_thread is None:
+            _timer_thread = threading.Thread(
+                target=_run_timers, name="Session.wait_for() timeouts"
+            )
+            _timer_thread.daemon = True
+            _timer_thread.start()
+
+    return timer
+
+
+def _cancel(timer):
+    """Cancels a timer returned by _schedule() if it hasn't fired yet."""
+
+    with _timers_changed:
+        try:
+            _timers.remove(timer)
+        except ValueError:
+            return
+        heapq.heapify(_timers)
+        _timers_changed.notify()
+
+
+def _run_timers():
+    while True:
+        with _timers_changed:
+            while not _timers or _timers[0][0] > timestamp.current():
+                _timers_changed.wait(
+                    _timers[0][0] - timestamp.current() if _timers else None
+                )
+            _, _, callback = heapq.heappop(_timers)
+
+        try:
+            callback()
+        except Exception:
+            log.swallow_exception("Session.wait_for() timeout handler failed:")
+
+
 def get(pid):
     with _lock:
         return next((session for session in _sessions if session.pid == pid), None)
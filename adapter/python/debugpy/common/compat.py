@@ -8,7 +8,6 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 """
 
 import functools
-import inspect
 import itertools
 import sys
 
@@ -159,6 +158,8 @@ def srcnameof(obj):
 
     name = nameof(obj, quote=True)
 
+    import inspect
+
     # Get the source information if possible.
     try:
         src_file = filename(inspect.getsourcefile(obj), "replace")
@@ -177,20 +178,24 @@ def srcnameof(obj):
     return name
 
 
+# Same as inspect.CO_VARARGS and inspect.CO_VARKEYWORDS.
+_CO_VARARGS = 0x04
+_CO_VARKEYWORDS = 0x08
+
+
 def kwonly(f):
     """Makes all arguments with default values keyword-only.
 
     If the default value is kwonly.required, then the argument must be specified.
     """
 
-    try:
-        inspect.getfullargspec
-    except AttributeError:
-        arg_names, args_name, kwargs_name, arg_defaults = inspect.getargspec(f)
-    else:
-        arg_names, args_name, kwargs_name, arg_defaults, _, _, _ = inspect.getfullargspec(f)
+    # This is used by debugpy/__init__.py, so it uses the code object directly rather
+    # than inspect, which is costly to import.
+    code = f.__code__
+    arg_names = code.co_varnames[: code.co_argcount]
+    arg_defaults = f.__defaults__ or ()
 
-    assert args_name is None and kwargs_name is None
+    assert not code.co_flags & (_CO_VARARGS | _CO_VARKEYWORDS)
     argc = len(arg_names)
     pos_argc = argc - len(arg_defaults)
     required_names = {
@@ -7,8 +7,10 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 """Improved JSON serialization.
 """
 
+import functools
 import json
 import operator
+import threading
 
 
 JsonDecoder = json.JSONDecoder
@@ -86,8 +88,64 @@ class JsonObject(object):
 # The validator must either raise TypeError or ValueError describing why the property
 # value is invalid, or else return the value of the property, possibly after performing
 # some substitutions - e.g. replacing () with some default value.
+#
+# Validators are normally created inline, right where the property is accessed, so
+# the factories below cache them by their arguments. Repeated accesses thus reuse
+# the same validator, which also lets MessageDict memoize the validated values.
+
+
+_validators = {}
+_validators_lock = threading.Lock()
+
+_constant_types = (bool, int, float, type, bytes, type(""))
+
+
+def _is_cacheable(arg):
+    """Whether a validator factory argument is a constant that can be part of the
+    cache key. Anything else - notably, validators that were created ad hoc, and
+    mutable default values - bypasses the cache, so that it cannot grow unbounded.
+    """
+
+    if arg is None or isinstance(arg, _constant_types):
+        return True
+    elif isinstance(arg, tuple):
+        return all(_is_cacheable(x) for x in arg)
+    else:
+        return getattr(arg, "_cached_validator", False)
+
+
+def _cached(factory):
+    """Decorates a validator factory to return the same validator when invoked
+    repeatedly with the same constant arguments.
+    """
+
+    @functools.wraps(factory)
+    def get_validator(*args, **kwargs):
+        # Types are part of the key, so that e.g. default(1) and default(True) are
+        # different validators even though 1 == True.
+        if not all(_is_cacheable(x) for x in args + tuple(kwargs.values())):
+            return factory(*args, **kwargs)
+        key = (factory.__name__,) + tuple((type(x), x) for x in args)
+        key += tuple(sorted((k, type(v), v) for k, v in kwargs.items()))
+
+        try:
+            return _validators[key]
+        except KeyError:
+            pass
+
+        validate = factory(*args, **kwargs)
+        validate._cached_validator = True
+        with _validators_lock:
+            return _validators.setdefault(key, validate)
+
+    return get_validator
 
 
+def _identity(value):
+    return value
+
+
+@_cached
 def of_type(*classinfo, **kwargs):
     """Returns a validator for a JSON property that requires it to have a value of
     the specified type. If optional=True, () is also allowed.
@@ -100,16 +158,18 @@ def of_type(*classinfo, **kwargs):
     assert not len(kwargs)
 
     def validate(value):
-        if (optional and value == ()) or isinstance(value, classinfo):
+        if isinstance(value, classinfo) or (optional and value == ()):
             return value
         else:
             if not optional and value == ():
                 raise ValueError("must be specified")
             raise TypeError("must be " + " or ".join(t.__name__ for t in classinfo))
 
+    validate.classinfo = classinfo
     return validate
 
 
+@_cached
 def default(default):
     """Returns a validator for a JSON property with a default value.
 
@@ -128,6 +188,7 @@ def default(default):
     return validate
 
 
+@_cached
 def enum(*values, **kwargs):
     """Returns a validator for a JSON enum.
 
@@ -152,6 +213,7 @@ def enum(*values, **kwargs):
     return validate
 
 
+@_cached
 def array(validate_item=False, vectorize=False, size=None):
     """Returns a validator for a JSON array.
 
@@ -178,10 +240,14 @@ def array(validate_item=False, vectorize=False, size=None):
     """
 
     if not validate_item:
-        validate_item = lambda x: x
+        validate_item = _identity
     elif isinstance(validate_item, type) or isinstance(validate_item, tuple):
         validate_item = of_type(validate_item)
 
+    # Items that only need a type check are checked inline, rather than by invoking
+    # the item validator for each one of them.
+    item_classinfo = getattr(validate_item, "classinfo", None)
+
     if size is None:
         validate_size = lambda _: True
     elif isinstance(size, set):
@@ -215,13 +281,19 @@ def array(validate_item=False, vectorize=False, size=None):
         elif vectorize and not isinstance(value, (list, dict)):
             value = [value]
 
-        of_type(list)(value)
+        if not isinstance(value, list):
+            raise TypeError("must be list")
 
         size_err = validate_size(value)  # True if valid, str if error
         if size_err is not True:
             raise ValueError(size_err)
 
+        if validate_item is _identity:
+            return value
+
         for i, item in enumerate(value):
+            if item_classinfo is not None and isinstance(item, item_classinfo):
+                continue
             try:
                 value[i] = validate_item(item)
             except (TypeError, ValueError) as exc:
@@ -231,6 +303,7 @@ def array(validate_item=False, vectorize=False, size=None):
     return validate
 
 
+@_cached
 def object(validate_value=False):
     """Returns a validator for a JSON object.
 
@@ -253,7 +326,8 @@ def object(validate_value=False):
         if value == ():
             return {}
 
-        of_type(dict)(value)
+        if not isinstance(value, dict):
+            raise TypeError("must be dict")
         if validate_value:
             for k, v in value.items():
                 try:
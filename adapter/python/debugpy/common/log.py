@@ -7,10 +7,8 @@ from __future__ import absolute_import, division, print_function, unicode_litera
 import atexit
 import contextlib
 import functools
-import inspect
 import io
 import os
-import platform
 import sys
 import threading
 import traceback
@@ -43,8 +41,25 @@ def _update_levels():
     _levels = frozenset(level for file in _files.values() for level in file.levels)
 
 
+def is_enabled(level):
+    """Whether messages at the specified level are written to any log file.
+
+    Code that does expensive work only to log its result should check this first.
+    """
+    return level in _levels
+
+
 class LogFile(object):
-    def __init__(self, filename, file, levels=LEVELS, close_file=True):
+    FLUSH_TIMEOUT = 5
+    """How long close() waits for queued output to be written, in seconds."""
+
+    def __init__(
+        self, filename, file, levels=LEVELS, close_file=True, background=False
+    ):
+        """If background=True, output is written and flushed by a background thread,
+        so that logging does not block on file I/O.
+        """
+
         info("Also logging to {0!j}.", filename)
 
         self.filename = filename
@@ -52,19 +67,40 @@ class LogFile(object):
         self.close_file = close_file
         self._levels = frozenset(levels)
 
+        self._pid = os.getpid()
+        self._queue = None
+        self._queue_changed = None
+        self._file_lock = None
+        self._writer_thread = None
+        if background:
+            self._queue = []
+            self._queue_changed = threading.Condition(threading.Lock())
+            self._file_lock = threading.Lock()
+            self._writer_thread = threading.Thread(
+                target=self._write_queued, name=fmt("log writer {0}", filename)
+            )
+            self._writer_thread.pydev_do_not_trace = True
+            self._writer_thread.is_pydev_daemon_thread = True
+            self._writer_thread.daemon = True
+            self._writer_thread.start()
+
         with _lock:
             _files[self.filename] = self
             _update_levels()
-            info(
-                "{0} {1}\n{2} {3} ({4}-bit)\ndebugpy {5}",
-                platform.platform(),
-                platform.machine(),
-                platform.python_implementation(),
-                platform.python_version(),
-                64 if sys.maxsize > 2 ** 32 else 32,
-                debugpy.__version__,
-                _to_files=[self],
-            )
+            if "info" in self._levels:
+                # Only imported when needed, since it's slow to import.
+                import platform
+
+                info(
+                    "{0} {1}\n{2} {3} ({4}-bit)\ndebugpy {5}",
+                    platform.platform(),
+                    platform.machine(),
+                    platform.python_implementation(),
+                    platform.python_version(),
+                    64 if sys.maxsize > 2 ** 32 else 32,
+                    debugpy.__version__,
+                    _to_files=[self],
+                )
 
     @property
     def levels(self):
@@ -77,12 +113,56 @@ class LogFile(object):
             _update_levels()
 
     def write(self, level, output):
-        if level in self.levels:
-            try:
-                self.file.write(output)
-                self.file.flush()
-            except Exception:
-                pass
+        if level not in self.levels:
+            return
+
+        # After a fork, the writer thread only exists in the parent process.
+        if self._writer_thread is not None and self._pid == os.getpid():
+            with self._queue_changed:
+                self._queue.append(output)
+                self._queue_changed.notify()
+            if level == "error":
+                # Errors are often logged right before os._exit(), which would lose
+                # them along with everything queued before, so write them right away.
+                self._write_now()
+            return
+
+        try:
+            self.file.write(output)
+            self.file.flush()
+        except Exception:
+            pass
+
+    def _write_queued(self):
+        """Writes all output that was queued since the previous write, and flushes the
+        file once for all of it, until the file is closed.
+        """
+
+        while True:
+            with self._queue_changed:
+                while not self._queue and self._writer_thread is not None:
+                    self._queue_changed.wait()
+                closed = self._writer_thread is None
+
+            self._write_now()
+            if closed:
+                return
+
+    def _write_now(self):
+        """Writes and flushes all output queued so far, on the calling thread.
+        """
+
+        # Taking the output and writing it happen under the same lock, so that
+        # output is written in order regardless of which thread writes it.
+        with self._file_lock:
+            with self._queue_changed:
+                output, self._queue = self._queue, []
+            if output:
+                try:
+                    self.file.write("".join(output))
+                    self.file.flush()
+                except Exception:
+                    pass
 
     def close(self):
         with _lock:
@@ -90,6 +170,13 @@ class LogFile(object):
             _update_levels()
         info("Not logging to {0!j} anymore.", self.filename)
 
+        writer_thread = self._writer_thread
+        if writer_thread is not None and self._pid == os.getpid():
+            with self._queue_changed:
+                self._writer_thread = None
+                self._queue_changed.notify()
+            writer_thread.join(self.FLUSH_TIMEOUT)
+
         if self.close_file:
             try:
                 self.file.close()
@@ -128,11 +215,14 @@ def newline(level="info"):
 def write(level, text, _to_files=all):
     assert level in LEVELS
 
+    text = getattr(_tls, "prefix", "") + text
+    if _to_files is all and level not in _levels:
+        return text
+
     t = timestamp.current()
     format_string = "{0}+{1:" + timestamp_format + "}: "
     prefix = fmt(format_string, level[0].upper(), t)
 
-    text = getattr(_tls, "prefix", "") + text
     indent = "\n" + (" " * len(prefix))
     output = indent.join(text.split("\n"))
     output = prefix + output + "\n\n"
@@ -190,8 +280,7 @@ def _exception(format_string="", *args, **kwargs):
 
     exception = "".join(traceback.format_exception(*exc_info))
 
-    f = inspect.currentframe()
-    f = f.f_back if f else f  # don't log this frame
+    f = sys._getframe(1)  # don't log this frame
     try:
         stack = "".join(traceback.format_stack(f))
     finally:
@@ -263,7 +352,12 @@ def to_file(filename=None, prefix=None, levels=LEVELS):
 
     file = _files.get(filename)
     if file is None:
-        file = LogFile(filename, io.open(filename, "w", encoding="utf-8"), levels)
+        file = LogFile(
+            filename,
+            io.open(filename, "w", encoding="utf-8"),
+            levels,
+            background=True,
+        )
     else:
         file.levels = levels
     return file
@@ -372,7 +466,7 @@ def _repr(value):  # pragma: no cover
 
 
 def _vars(*names):  # pragma: no cover
-    locals = inspect.currentframe().f_back.f_locals
+    locals = sys._getframe(1).f_locals
     if names:
         locals = {name: locals[name] for name in names if name in locals}
     warning("$VARS {0!r}", locals)
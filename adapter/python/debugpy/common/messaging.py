@@ -20,7 +20,7 @@ import socket
 import sys
 import threading
 
-from debugpy.common import compat, fmt, json, log
+from debugpy.common import compat, fmt, json, log, timestamp
 from debugpy.common.compat import unicode
 
 
@@ -66,6 +66,13 @@ class JsonIOStream(object):
 
     MAX_BODY_SIZE = 0xFFFFFF
 
+    READ_BUFFER_SIZE = 0x10000
+    """Initial size of the buffer that message bodies are read into."""
+
+    MAX_RETAINED_BUFFER_SIZE = 0x400000
+    """Bodies larger than this are read into a buffer that is not kept around
+    for the next message, so that one huge message doesn't pin its memory."""
+
     json_decoder_factory = json.JsonDecoder
     """Used by read_json() when decoder is None."""
 
@@ -108,11 +115,12 @@ class JsonIOStream(object):
         if name is None:
             name = repr(sock)
 
-        # TODO: investigate switching to buffered sockets; readline() on unbuffered
-        # sockets is very slow! Although the implementation of readline() itself is
-        # native code, it calls read(1) in a loop - and that then ultimately calls
-        # SocketIO.readinto(), which is implemented in Python.
-        socket_io = sock.makefile("rwb", 0)
+        # The reader is buffered, since readline() on an unbuffered socket calls
+        # read(1) in a loop, which ultimately calls SocketIO.readinto() - which is
+        # implemented in Python - for every byte of the headers. The writer is not,
+        # so that every write_json() goes out immediately.
+        reader = sock.makefile("rb")
+        writer = sock.makefile("wb", 0)
 
         # SocketIO.close() doesn't close the underlying socket.
         def cleanup():
@@ -122,7 +130,7 @@ class JsonIOStream(object):
                 pass
             sock.close()
 
-        return cls(socket_io, socket_io, name, cleanup)
+        return cls(reader, writer, name, cleanup)
 
     def __init__(self, reader, writer, name=None, cleanup=lambda: None):
         """Creates a new JsonIOStream.
@@ -148,6 +156,7 @@ class JsonIOStream(object):
         self._writer = writer
         self._cleanup = cleanup
         self._closed = False
+        self._read_buffer = bytearray(self.READ_BUFFER_SIZE)
 
     def close(self):
         """Closes the stream, the reader, and the writer.
@@ -168,10 +177,13 @@ class JsonIOStream(object):
                 try:
                     self._writer.close()
                 finally:
-                    if self._reader is not self._writer:
-                        self._reader.close()
+                    # Clean up before closing the reader - for sockets, that shuts the
+                    # connection down, which unblocks any read() still in progress. A
+                    # buffered reader can't be closed while it's being read from.
+                    self._cleanup()
             finally:
-                self._cleanup()
+                if self._reader is not self._writer:
+                    self._reader.close()
         except Exception:
             # On Python 2, close() will raise an exception if there is a concurrent
             # read() or write(), which is a common and expected occurrence with
@@ -182,23 +194,69 @@ class JsonIOStream(object):
                 )
 
     def _log_message(self, dir, data, logger=log.debug):
+        # This is invoked for every message, so don't even build the format string
+        # unless it's going to be used.
+        if logger is log.debug and not log.is_enabled("debug"):
+            return
         format_string = "{0} {1} " + (
             "{2!j:indent=None}" if isinstance(data, list) else "{2!j}"
         )
         return logger(format_string, self.name, dir, data)
 
     def _read_line(self, reader):
-        line = b""
+        # readline() normally returns the whole line at once; it only needs to be
+        # called again if the line ended in a bare "\n", or the read stopped short.
+        parts = []
         while True:
             try:
-                line += reader.readline()
+                part = reader.readline()
             except Exception as exc:
                 raise NoMoreMessages(str(exc), stream=self)
-            if not line:
+            if not part:
                 raise NoMoreMessages(stream=self)
-            if line.endswith(b"\r\n"):
-                line = line[0:-2]
-                return line
+            parts.append(part)
+            if part.endswith(b"\r\n") or (
+                part == b"\n" and len(parts) > 1 and parts[-2].endswith(b"\r")
+            ):
+                break
+
+        line = parts[0] if len(parts) == 1 else b"".join(parts)
+        return line[0:-2]
+
+    def _read_body(self, reader, length):
+        """Reads a message body of the specified length into the read buffer, and
+        returns a memoryview over it. The view is only valid until the next read.
+        """
+
+        buffer = self._read_buffer
+        if len(buffer) < length:
+            buffer = bytearray(length)
+            if length <= self.MAX_RETAINED_BUFFER_SIZE:
+                self._read_buffer = buffer
+
+        body = memoryview(buffer)[:length]
+        readinto = getattr(reader, "readinto", None)
+
+        body_read = 0
+        while body_read < length:
+            try:
+                if readinto is not None:
+                    # Buffered readers only return once the view is full, raw ones
+                    # may return less, and the remainder is read on the next pass.
+                    count = readinto(body[body_read:])
+                else:
+                    # Python 2 socket files have no readinto().
+                    chunk = reader.read(length - body_read)
+                    count = len(chunk)
+                    body[body_read : body_read + count] = chunk
+                if not count:
+                    raise EOFError
+            except Exception as exc:
+                # Not logged due to https://github.com/microsoft/ptvsd/issues/1699
+                raise NoMoreMessages(str(exc), stream=self)
+            body_read += count
+
+        return body
 
     def read_json(self, decoder=None):
         """Read a single JSON value from reader.
@@ -261,30 +319,21 @@ class JsonIOStream(object):
             except Exception:
                 log_message_and_reraise_exception()
 
-        body_start = len(raw_chunks)
-        body_remaining = length
-        while body_remaining > 0:
-            try:
-                chunk = reader.read(body_remaining)
-                if not chunk:
-                    raise EOFError
-            except Exception as exc:
-                # Not logged due to https://github.com/microsoft/ptvsd/issues/1699
-                raise NoMoreMessages(str(exc), stream=self)
-
-            raw_chunks.append(chunk)
-            body_remaining -= len(chunk)
-        assert body_remaining == 0
-
-        body = b"".join(raw_chunks[body_start:])
+        raw_body = self._read_body(reader, length)
         try:
-            body = body.decode("utf-8")
+            # Decoded straight from the read buffer, without an intermediate bytes.
+            if sys.version_info >= (3,):
+                body = unicode(raw_body, "utf-8")
+            else:
+                body = raw_body.tobytes().decode("utf-8")
         except Exception:
+            raw_chunks.append(raw_body.tobytes())
             log_message_and_reraise_exception()
 
         try:
             body = decoder.decode(body)
         except Exception:
+            raw_chunks.append(raw_body.tobytes())
             log_message_and_reraise_exception()
 
         # If parsed successfully, log as JSON for readability.
@@ -302,24 +351,50 @@ class JsonIOStream(object):
             # anticipating EOFError from it in case it got closed concurrently.
             raise NoMoreMessages(stream=self)
 
-        encoder = encoder if encoder is not None else self.json_encoder_factory()
-        writer = self._writer
+        body = self.encode_json(value, encoder)
+        try:
+            self.write_frames([self.frame_header(len(body)), body])
+        except JsonIOError:
+            self._log_message("<--", value, logger=log.swallow_exception)
+            raise
+
+        self._log_message("<--", value)
 
-        # Format the value as a message, and try to log any failures using as much
-        # information as we already have at the point of the failure. For example,
-        # if it fails after it is serialized to JSON, log that JSON.
+    def encode_json(self, value, encoder=None):
+        """Encodes a single JSON value as the UTF-8 body of a message, without
+        writing it.
+        """
 
+        encoder = encoder if encoder is not None else self.json_encoder_factory()
+
+        # Try to log any failures using as much information as we already have at
+        # the point of the failure.
         try:
             body = encoder.encode(value)
         except Exception:
-            raise self._log_message("<--", value, logger=log.exception)
+            self._log_message("<--", value, logger=log.reraise_exception)
         if not isinstance(body, bytes):
             body = body.encode("utf-8")
+        return body
+
+    @staticmethod
+    def frame_header(length):
+        """Returns the headers for a message body of the specified length."""
+        return fmt("Content-Length: {0}\r\n\r\n", length).encode("ascii")
+
+    def write_frames(self, chunks):
+        """Writes already encoded headers and bodies into writer, all at once.
+
+        chunks is a sequence of bytes-like objects, which are concatenated, so
+        that any number of messages can be sent with a single write.
+        """
+
+        if self._closed:
+            raise NoMoreMessages(stream=self)
 
-        header = fmt("Content-Length: {0}\r\n\r\n", len(body))
-        header = header.encode("ascii")
+        writer = self._writer
+        data = chunks[0] if len(chunks) == 1 else b"".join(chunks)
 
-        data = header + body
         data_written = 0
         try:
             while data_written < len(data):
@@ -332,11 +407,8 @@ class JsonIOStream(object):
                 data_written += written
             writer.flush()
         except Exception as exc:
-            self._log_message("<--", value, logger=log.exception)
             raise JsonIOError(stream=self, cause=exc)
 
-        self._log_message("<--", value)
-
     def __repr__(self):
         return fmt("{0}({1!r})", type(self).__name__, self.name)
 
@@ -362,6 +434,12 @@ class MessageDict(collections.OrderedDict):
     def __init__(self, message, items=None):
         assert message is None or isinstance(message, Message)
 
+        # Must be set first, because populating the dict invalidates it.
+        self._validated = {}
+        """Values returned by __call__, keyed by the arguments it was invoked with.
+        It is cleared whenever the dict is modified.
+        """
+
         if items is None:
             super(MessageDict, self).__init__()
         else:
@@ -401,8 +479,20 @@ class MessageDict(collections.OrderedDict):
         the same text that applies_to(self.messages).
 
         See debugpy.common.json for reusable validators.
+
+        The validated value is memoized, so that accessing the same property with the
+        same validator again does not repeat the validation.
         """
 
+        # The type is part of the key, so that e.g. 1 and True are told apart.
+        memo_key = (key, type(validate), validate, optional)
+        try:
+            return self._validated[memo_key]
+        except KeyError:
+            pass
+        except TypeError:
+            memo_key = None  # validate is an unhashable default value
+
         if not validate:
             validate = lambda x: x
         elif isinstance(validate, type) or isinstance(validate, tuple):
@@ -419,10 +509,35 @@ class MessageDict(collections.OrderedDict):
             if not err.startswith("["):
                 err = " " + err
             raise message.isnt_valid("{0!j}{1}", key, err)
+
+        if memo_key is not None:
+            self._validated[memo_key] = value
         return value
 
-    def _invalid_if_no_key(func):
+    def __setitem__(self, key, value):
+        self._validated.clear()
+        super(MessageDict, self).__setitem__(key, value)
+
+    def clear(self):
+        self._validated.clear()
+        super(MessageDict, self).clear()
+
+    def popitem(self, *args, **kwargs):
+        self._validated.clear()
+        return super(MessageDict, self).popitem(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self._validated.clear()
+        return super(MessageDict, self).setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self._validated.clear()
+        super(MessageDict, self).update(*args, **kwargs)
+
+    def _invalid_if_no_key(func, mutates=False):
         def wrap(self, key, *args, **kwargs):
+            if mutates:
+                self._validated.clear()
             try:
                 return func(self, key, *args, **kwargs)
             except KeyError:
@@ -432,8 +547,8 @@ class MessageDict(collections.OrderedDict):
         return wrap
 
     __getitem__ = _invalid_if_no_key(collections.OrderedDict.__getitem__)
-    __delitem__ = _invalid_if_no_key(collections.OrderedDict.__delitem__)
-    pop = _invalid_if_no_key(collections.OrderedDict.pop)
+    __delitem__ = _invalid_if_no_key(collections.OrderedDict.__delitem__, True)
+    pop = _invalid_if_no_key(collections.OrderedDict.pop, True)
 
     del _invalid_if_no_key
 
@@ -1144,8 +1259,31 @@ class JsonMessageChannel(object):
             channel.send_request(...)
             # No interleaving messages can be sent here from other threads.
             channel.send_event(...)
+
+    Outgoing messages are serialized outside of that lock, and written to the
+    stream by a dedicated writer thread, which sends everything that was queued
+    since its last write in a single write.
     """
 
+    FLUSH_TIMEOUT = 5
+    """How long close() waits for queued messages to be written, in seconds."""
+
+    concurrent_requests = frozenset()
+    """Commands of incoming requests that can be handled concurrently.
+
+    Handlers for these requests run on a pool of up to max_concurrent_handlers
+    background threads, so that a slow one doesn't hold up everything else. Requests
+    with the same command are still handled one at a time, in the order received.
+    Events and responses are handled as usual, without waiting for them. Any other
+    request waits until all concurrent handlers for requests that were received
+    before it have returned, and is handled before any of those received after it.
+
+    Must be set before start() is called.
+    """
+
+    max_concurrent_handlers = 4
+    """Maximum number of concurrent_requests handlers that can run at the same time."""
+
     def __init__(self, stream, handlers=None, name=None):
         self.stream = stream
         self.handlers = handlers
@@ -1158,7 +1296,14 @@ class JsonMessageChannel(object):
         self._handler_queue = []  # [(what, handler)]
         self._handlers_enqueued = threading.Condition(self._lock)
         self._handler_thread = None
+        self._handler_pool = None
         self._parser_thread = None
+        self._write_lock = threading.Lock()
+        self._write_queue = []  # [([chunk], MessageDict)]
+        self._write_queue_changed = threading.Condition(self._write_lock)
+        self._writing = False
+        self._write_error = None
+        self._writer_thread = None
 
     def __str__(self):
         return self.name
@@ -1183,9 +1328,14 @@ class JsonMessageChannel(object):
         that is still pending, as will any handlers registered via on_response().
         """
         with self:
-            if not self._closed:
-                self._closed = True
-                self.stream.close()
+            if self._closed:
+                return
+            self._closed = True
+
+        # Wait for the queued messages without holding the channel lock, so that a
+        # stalled peer doesn't block other senders and the parser thread meanwhile.
+        self._flush_writes()
+        self.stream.close()
 
     def start(self):
         """Starts a message loop which parses incoming messages and invokes handlers
@@ -1216,6 +1366,9 @@ class JsonMessageChannel(object):
         handler_thread = self._handler_thread
         if handler_thread is not None:
             handler_thread.join()
+        handler_pool = self._handler_pool
+        if handler_pool is not None:
+            handler_pool.wait_idle()
 
     # Order of keys for _prettify() - follows the order of properties in
     # https://microsoft.github.io/debug-adapter-protocol/specification
@@ -1258,16 +1411,118 @@ class JsonMessageChannel(object):
         """
 
         assert "seq" not in message
-        with self:
-            seq = next(self._seq_iter)
-
         message = MessageDict(None, message)
-        message["seq"] = seq
         self._prettify(message)
 
+        # Serialize before the seq is known, so that it happens outside of the lock,
+        # and splice the seq in front of the other properties afterwards.
+        body = self.stream.encode_json(message)
+        assert body.startswith(b"{")
+        if sys.version_info >= (3,):
+            body = memoryview(body)
+        body_tail = body[1:] if len(body) > 2 else b"}"
+
         with self:
+            seq = next(self._seq_iter)
             yield seq
-            self.stream.write_json(message)
+
+            head = fmt('{{"seq": {0}{1}', seq, ", " if len(body) > 2 else "")
+            head = head.encode("ascii")
+            header = self.stream.frame_header(len(head) + len(body_tail))
+
+            message["seq"] = seq
+            self._prettify(message)
+            self._enqueue_write([header, head, body_tail], message)
+
+    def _enqueue_write(self, chunks, message):
+        """Queues the chunks of an encoded message for the writer thread. Messages
+        are written in the order they are queued.
+        """
+
+        with self._write_lock:
+            if self._closed or self.stream._closed:
+                # Don't log this - see JsonIOStream.write_json()
+                raise NoMoreMessages(stream=self.stream)
+            if self._write_error is not None:
+                raise JsonIOError(stream=self.stream, cause=self._write_error)
+
+            self._write_queue.append((chunks, message))
+            self._write_queue_changed.notify_all()
+
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(
+                    target=self._write_messages, name=fmt("{0} message writer", self)
+                )
+                self._writer_thread.pydev_do_not_trace = True
+                self._writer_thread.is_pydev_daemon_thread = True
+                self._writer_thread.daemon = True
+                self._writer_thread.start()
+
+    def _write_messages(self):
+        """Writes queued messages until the channel is closed, batching all the
+        messages that were queued while the previous write was in progress.
+        """
+
+        while True:
+            with self._write_lock:
+                while not self._write_queue and not self._closed:
+                    self._write_queue_changed.wait()
+
+                batch = self._write_queue
+                self._write_queue = []
+                if not batch:
+                    self._writer_thread = None
+                    self._write_queue_changed.notify_all()
+                    return
+                self._writing = True
+
+            chunks = [chunk for message_chunks, _ in batch for chunk in message_chunks]
+            try:
+                self.stream.write_frames(chunks)
+            except Exception as exc:
+                # The stream may have been closed concurrently, which the senders
+                # anticipate (see _enqueue_write()), so don't log that.
+                if not isinstance(exc, NoMoreMessages) and not self.stream._closed:
+                    for _, message in batch:
+                        self.stream._log_message(
+                            "<--", message, logger=log.swallow_exception
+                        )
+                    if isinstance(exc, JsonIOError) and exc.cause is not None:
+                        exc = exc.cause
+                with self._write_lock:
+                    self._write_error = exc
+                    del self._write_queue[:]
+                    self._writing = False
+                    self._writer_thread = None
+                    self._write_queue_changed.notify_all()
+                return
+
+            for _, message in batch:
+                self.stream._log_message("<--", message)
+
+            with self._write_lock:
+                self._writing = False
+                self._write_queue_changed.notify_all()
+
+    def _flush_writes(self):
+        """Waits until all queued messages have been written, or FLUSH_TIMEOUT has
+        passed. Called by close() after the channel was marked as closed.
+        """
+
+        if self._writer_thread is threading.current_thread():
+            return
+
+        with self._write_lock:
+            self._write_queue_changed.notify_all()
+            # Condition.wait() does not report timeouts on Python 2, so keep track
+            # of the deadline separately.
+            deadline = timestamp.current() + self.FLUSH_TIMEOUT
+            while self._write_queue or self._writing:
+                remaining = deadline - timestamp.current()
+                if remaining <= 0:
+                    log.warning("Timed out writing queued messages to {0}", self)
+                    break
+                self._write_queue_changed.wait(remaining)
 
     def send_request(self, command, arguments=None, on_before_send=None):
         """Sends a new request, and returns the OutgoingRequest object for it.
@@ -1442,6 +1697,12 @@ class JsonMessageChannel(object):
             self._handler_queue.extend((what, handler) for handler in handlers)
             self._handlers_enqueued.notify_all()
 
+            if self.concurrent_requests and self._handler_pool is None:
+                self._handler_pool = _HandlerPool(
+                    fmt("{0} concurrent message handler", self),
+                    self.max_concurrent_handlers,
+                )
+
             # If there is anything to handle, but there's no handler thread yet,
             # spin it up. This will normally happen only once, on the first call
             # to _enqueue_handlers(), and that thread will run all the handlers
@@ -1499,13 +1760,26 @@ class JsonMessageChannel(object):
                 if closed and handler in (Event._handle, Request._handle):
                     continue
 
-                with log.prefixed("/handling {0}/\n", what.describe()):
-                    try:
-                        handler()
-                    except Exception:
-                        # It's already logged by the handler, so just fail fast.
-                        self.close()
-                        os._exit(1)
+                if self._handler_pool is not None:
+                    if isinstance(what, Request):
+                        if what.command in self.concurrent_requests:
+                            run = functools.partial(self._run_handler, what, handler)
+                            self._handler_pool.submit(what.command, run)
+                            continue
+                        self._handler_pool.wait_idle()
+                    elif isinstance(what, Disconnect):
+                        self._handler_pool.wait_idle()
+
+                self._run_handler(what, handler)
+
+    def _run_handler(self, what, handler):
+        with log.prefixed("/handling {0}/\n", what.describe()):
+            try:
+                handler()
+            except Exception:
+                # It's already logged by the handler, so just fail fast.
+                self.close()
+                os._exit(1)
 
     def _get_handler_for(self, type, name):
         """Returns the handler for a message of a given type.
@@ -1542,6 +1816,75 @@ class JsonMessageChannel(object):
             )
 
 
+class _HandlerPool(object):
+    """Runs handlers on up to max_workers background threads.
+
+    Every handler is submitted with a key, and handlers with the same key run one at
+    a time, in the order in which they were submitted. Worker threads are spun up
+    as needed, and exit as soon as there's nothing left to run.
+    """
+
+    def __init__(self, name, max_workers):
+        self.name = name
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._lanes = {}  # {key: deque([handler])}, first one running or ready
+        self._ready = collections.deque()  # [key], whose first handler can run
+        self._pending = 0  # submitted handlers that haven't returned yet
+        self._workers = 0
+
+    def submit(self, key, handler):
+        with self._lock:
+            self._pending += 1
+
+            lane = self._lanes.get(key)
+            if lane is not None:
+                lane.append(handler)
+                return
+            self._lanes[key] = collections.deque([handler])
+            self._ready.append(key)
+
+            if self._workers < self.max_workers:
+                self._workers += 1
+                thread = threading.Thread(target=self._work, name=self.name)
+                thread.pydev_do_not_trace = True
+                thread.is_pydev_daemon_thread = True
+                thread.daemon = True
+                thread.start()
+
+    def wait_idle(self):
+        """Blocks until all submitted handlers have returned."""
+
+        with self._lock:
+            while self._pending:
+                self._idle.wait()
+
+    def _work(self):
+        while True:
+            with self._lock:
+                if not self._ready:
+                    self._workers -= 1
+                    return
+                key = self._ready.popleft()
+                handler = self._lanes[key][0]
+
+            try:
+                handler()
+            finally:
+                with self._lock:
+                    lane = self._lanes[key]
+                    lane.popleft()
+                    if lane:
+                        self._ready.append(key)
+                    else:
+                        del self._lanes[key]
+
+                    self._pending -= 1
+                    if not self._pending:
+                        self._idle.notify_all()
+
+
 class MessageHandlers(object):
     """A simple delegating message handlers object for use with JsonMessageChannel.
     For every argument provided, the object gets an attribute with the corresponding
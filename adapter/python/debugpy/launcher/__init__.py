@@ -19,6 +19,10 @@ from the launcher and the servers."""
 channel = None
 """DAP message channel to the adapter."""
 
+warm = False
+"""Whether the launcher was started ahead of time, and is still waiting for the
+debuggee's command line and working directory."""
+
 
 def connect(host, port):
     from debugpy.common import log, messaging, sockets
@@ -50,6 +50,8 @@ def main():
         port = adapter
     port = int(port)
 
+    launcher.warm = "--warm" in launcher_argv[1:]
+
     launcher.connect(host, port)
     launcher.channel.wait()
 
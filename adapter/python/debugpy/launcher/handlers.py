@@ -12,10 +12,28 @@ import debugpy
 from debugpy import launcher
 from debugpy.common import compat, json
 from debugpy.common.compat import unicode
-from debugpy.launcher import debuggee
+from debugpy.launcher import debuggee, output
+
+
+warm_cwd = None
+"""Working directory for the debuggee, sent by "setCommandLine" if the launcher was
+started ahead of time."""
 
 
 def launch_request(request):
+    if launcher.warm:
+        raise request.isnt_valid(
+            '"setCommandLine" must come before "launch" for a launcher started ahead of time'
+        )
+    if warm_cwd is not None:
+        # The debuggee inherits it.
+        try:
+            os.chdir(warm_cwd)
+        except Exception as exc:
+            raise request.cant_handle(
+                "Couldn't change to working directory {0!j}: {1}", warm_cwd, exc
+            )
+
     debug_options = set(request("debugOptions", json.array(unicode)))
 
     # Handling of properties that can also be specified as legacy "debugOptions" flags.
@@ -119,6 +137,12 @@ def launch_request(request):
         # Force UTF-8 output to minimize data loss due to re-encoding.
         env["PYTHONIOENCODING"] = "utf-8"
 
+    output_rate_limit = request("outputRateLimit", int, optional=True)
+    if output_rate_limit != ():
+        if output_rate_limit <= 0:
+            raise request.isnt_valid('"outputRateLimit" must be positive')
+        output.rate_limit = output_rate_limit
+
     if property_or_debug_option("waitOnNormalExit", "WaitOnNormalExit"):
         if console == "internalConsole":
             raise request.isnt_valid(
@@ -144,6 +168,25 @@ def launch_request(request):
     return {}
 
 
+def setCommandLine_request(request):
+    # A launcher that was started ahead of time didn't know the debuggee yet, so the
+    # adapter sends what would have been on its command line, and its working directory,
+    # right before the "launch" request.
+    global warm_cwd
+
+    if not launcher.warm:
+        raise request.isnt_valid(
+            '"setCommandLine" is only valid once, for a launcher started ahead of time'
+        )
+
+    sys.argv += request("args", json.array(unicode))
+    cwd = request("cwd", unicode, optional=True)
+    if cwd != ():
+        warm_cwd = cwd
+    launcher.warm = False
+    return {}
+
+
 def terminate_request(request):
     del debuggee.wait_on_exit_predicates[:]
     request.respond({})
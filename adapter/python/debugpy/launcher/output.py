@@ -10,17 +10,41 @@ import sys
 import threading
 
 from debugpy import launcher
-from debugpy.common import log
+from debugpy.common import fmt, log, timestamp
+
+
+rate_limit = None
+"""If not None, the maximum number of characters per second that are reported in
+"output" events for every category. Output in excess of that is still written to
+the local stream, but is dropped from "output" events, and replaced with a summary
+of how much was dropped.
+"""
 
 
 class CaptureOutput(object):
     """Captures output from the specified file descriptor, and tees it into another
     file descriptor while generating DAP "output" events for it.
+
+    Output is reported in batches: an "output" event is sent once MAX_EVENT_SIZE
+    characters accumulate, or FLUSH_INTERVAL seconds after the oldest output that
+    hasn't been reported yet was read, whichever comes first.
     """
 
     instances = {}
     """Keys are output categories, values are CaptureOutput instances."""
 
+    MIN_READ_SIZE = 0x1000
+    MAX_READ_SIZE = 0x10000
+    """Bounds for the size of reads from the file descriptor. It starts at the lower
+    bound, and doubles whenever a read fills it, up to the upper bound.
+    """
+
+    FLUSH_INTERVAL = 0.05
+    """Maximum latency of reporting output, in seconds."""
+
+    MAX_EVENT_SIZE = 0x10000
+    """Output is reported as soon as this many characters accumulate."""
+
     def __init__(self, whose, category, fd, stream):
         assert category not in self.instances
         self.instances[category] = self
@@ -31,6 +55,19 @@ class CaptureOutput(object):
         self._fd = fd
         self._decoder = codecs.getincrementaldecoder("utf-8")(errors="surrogateescape")
 
+        # Output read but not reported yet, guarded by _pending_lock.
+        self._pending_lock = threading.Lock()
+        self._pending_changed = threading.Condition(self._pending_lock)
+        self._pending = []
+        self._pending_size = 0
+        self._pending_since = None
+        self._final = False
+
+        # Rate limiting state, only accessed by _sender().
+        self._budget = rate_limit
+        self._budget_time = timestamp.current()
+        self._dropped = 0
+
         if stream is None:
             # Can happen if running under pythonw.exe.
             self._stream = None
@@ -50,6 +87,12 @@ class CaptureOutput(object):
                 )
                 self._encode = codecs.getencoder("utf-8")
 
+        self._sender_thread = threading.Thread(
+            target=self._sender, name=category + " sender"
+        )
+        self._sender_thread.daemon = True
+        self._sender_thread.start()
+
         self._worker_thread = threading.Thread(target=self._worker, name=category)
         self._worker_thread.start()
 
@@ -62,29 +105,42 @@ class CaptureOutput(object):
                 pass
 
     def _worker(self):
+        read_size = self.MIN_READ_SIZE
         while self._fd is not None:
             try:
-                s = os.read(self._fd, 0x1000)
+                s = os.read(self._fd, read_size)
             except Exception:
                 break
             if not len(s):
                 break
+            if len(s) == read_size and read_size < self.MAX_READ_SIZE:
+                read_size *= 2
             self._process_chunk(s)
 
         # Flush any remaining data in the incremental decoder.
         self._process_chunk(b"", final=True)
 
+        # Report everything that is still pending before returning, so that
+        # wait_for_remaining_output() can rely on that.
+        with self._pending_lock:
+            self._final = True
+            self._pending_changed.notify()
+        self._sender_thread.join()
+
     def _process_chunk(self, s, final=False):
         s = self._decoder.decode(s, final=final)
         if len(s) == 0:
             return
 
-        try:
-            launcher.channel.send_event(
-                "output", {"category": self.category, "output": s.replace("\r\n", "\n")}
-            )
-        except Exception:
-            pass  # channel to adapter is already closed
+        with self._pending_lock:
+            if not self._pending:
+                # Let the sender know when the output must be reported by.
+                self._pending_since = timestamp.current()
+                self._pending_changed.notify()
+            self._pending.append(s)
+            self._pending_size += len(s)
+            if self._pending_size >= self.MAX_EVENT_SIZE:
+                self._pending_changed.notify()
 
         if self._stream is None:
             return
@@ -107,6 +163,74 @@ class CaptureOutput(object):
                 break
             i += written
 
+    def _sender(self):
+        """Reports pending output in "output" events, until the worker is done."""
+
+        while True:
+            with self._pending_lock:
+                while True:
+                    if self._final or self._pending_size >= self.MAX_EVENT_SIZE:
+                        break
+                    if self._pending:
+                        deadline = self._pending_since + self.FLUSH_INTERVAL
+                        timeout = deadline - timestamp.current()
+                        if timeout <= 0:
+                            break
+                    else:
+                        timeout = None
+                    self._pending_changed.wait(timeout)
+
+                s = "".join(self._pending)
+                del self._pending[:]
+                self._pending_size = 0
+                final = self._final
+
+            self._report(s)
+            if final:
+                self._report_dropped()
+                return
+
+    def _report(self, s):
+        if rate_limit is not None and s:
+            # Token bucket: the budget refills at rate_limit per second, and never
+            # exceeds what can be reported in one second.
+            now = timestamp.current()
+            self._budget = min(
+                rate_limit, self._budget + (now - self._budget_time) * rate_limit
+            )
+            self._budget_time = now
+
+            dropped = 0
+            if len(s) > self._budget:
+                # Cut at a line boundary if possible, to keep the reported lines whole.
+                allowed = max(0, int(self._budget))
+                allowed = s.rfind("\n", 0, allowed) + 1 or allowed
+                dropped = len(s) - allowed
+                s = s[:allowed]
+            self._budget -= len(s)
+
+            # Report what was dropped before this output, and then this output.
+            if s:
+                self._report_dropped()
+            self._dropped += dropped
+
+        if s:
+            self._send_event(s)
+
+    def _report_dropped(self):
+        if self._dropped:
+            message = fmt("\n[{0} characters of output dropped]\n", self._dropped)
+            self._send_event(message)
+            self._dropped = 0
+
+    def _send_event(self, s):
+        try:
+            launcher.channel.send_event(
+                "output", {"category": self.category, "output": s.replace("\r\n", "\n")}
+            )
+        except Exception:
+            pass  # channel to adapter is already closed
+
 
 def wait_for_remaining_output():
     """Waits for all remaining output to be captured and propagated.
@@ -0,0 +1,84 @@
+
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+# Where a request from the debugger went
+ANSWERED = 'answered'  # Answered by the adapter, debugpy's response is dropped
+FORWARDED = 'forwarded'  # Forwarded to debugpy, its response goes to the debugger
+
+# Past this many outstanding requests the oldest are forgotten so the table
+# can't grow forever. Requests aren't expired by age: an evaluate or continue
+# may legitimately wait for as long as Maya sits at a breakpoint.
+MAX_SIZE = 4096
+
+
+class Route:
+    __slots__ = ('route', 'command', 'received')
+
+    def __init__(self, route, command, received):
+        self.route = route
+        self.command = command
+        self.received = received
+
+
+class SeqRouter:
+    """
+    Remembers what happened to each request from the debugger, keyed by its seq,
+    so that debugpy's responses can be routed with a single dict lookup.
+
+    A seq is moved to a bounded set of resolved seqs as soon as its response
+    is routed, which means a duplicate response to the same request is
+    recognized and can be dropped.
+    """
+
+    def __init__(self, max_size=MAX_SIZE):
+        self.max_size = max_size
+        self._routes = OrderedDict()  # Oldest first
+        self._resolved = OrderedDict()  # Seqs whose response was routed, oldest first
+        self._lock = Lock()
+
+    def answered(self, seq, command):
+        self._add(seq, ANSWERED, command)
+
+    def forwarded(self, seq, command):
+        self._add(seq, FORWARDED, command)
+
+    def resolve(self, request_seq):
+        """
+        Returns the Route of the request a response answers and forgets it,
+        or None if the request is unknown, already answered or was forgotten
+        """
+
+        with self._lock:
+            route = self._routes.pop(request_seq, None)
+            if route is not None:
+                self._resolved[request_seq] = None
+                while len(self._resolved) > self.max_size:
+                    self._resolved.popitem(last=False)
+            return route
+
+    def was_resolved(self, request_seq):
+        """
+        Whether a response to the request was already routed, i.e. another
+        response to it is a duplicate
+        """
+
+        with self._lock:
+            return request_seq in self._resolved
+
+    def __len__(self):
+        return len(self._routes)
+
+    def _add(self, seq, route, command):
+        now = time.perf_counter()
+
+        with self._lock:
+            self._routes[seq] = Route(route, command, now)
+            self._routes.move_to_end(seq)
+            self._resolved.pop(seq, None)
+
+            # Forget the oldest ones past the size limit
+            while len(self._routes) > self.max_size:
+                self._routes.popitem(last=False)
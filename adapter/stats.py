@@ -0,0 +1,101 @@
+
+from threading import Lock
+import json
+import time
+
+
+# Upper bounds, in milliseconds, of the latency histogram buckets.
+# Slower responses are counted in a last, unbounded bucket.
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class MessageStats:
+    """
+    Keeps a histogram of the time from when the debugger sent a request to
+    when debugpy's response came back, and byte counts, per command, along
+    with counts and sizes of the events debugpy sent.
+
+    Matching responses to requests is left to the SeqRouter, which
+    keeps the time each request was received.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._commands = {}
+        self._events = {}
+        self._started = time.time()
+
+    def request(self, command, size):
+        with self._lock:
+            stats = self._command_stats(command)
+            stats['requests'] += 1
+            stats['request_bytes'] += size
+
+    def response(self, command, received, size):
+        """
+        Records a response, received being the time.perf_counter()
+        at which its request was received
+        """
+
+        latency = (time.perf_counter() - received) * 1000
+
+        with self._lock:
+            stats = self._command_stats(command)
+            stats['responses'] += 1
+            stats['response_bytes'] += size
+            stats['total_ms'] += latency
+            stats['min_ms'] = min(stats['min_ms'], latency) if stats['min_ms'] is not None else latency
+            stats['max_ms'] = max(stats['max_ms'], latency)
+
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    break
+            else:
+                i = len(LATENCY_BUCKETS)
+            stats['histogram'][i] += 1
+
+    def event(self, name, size):
+        with self._lock:
+            stats = self._events.setdefault(name, {'count': 0, 'bytes': 0})
+            stats['count'] += 1
+            stats['bytes'] += size
+
+    def snapshot(self):
+        """
+        Returns the statistics so far as a JSON serializable dict
+        """
+
+        with self._lock:
+            commands = {}
+            for command, stats in self._commands.items():
+                stats = dict(stats, histogram=list(stats['histogram']))
+                if stats['responses']:
+                    stats['mean_ms'] = stats['total_ms'] / stats['responses']
+                commands[command] = stats
+
+            return {
+                'started': self._started,
+                'duration_s': time.time() - self._started,
+                'histogram_buckets_ms': list(LATENCY_BUCKETS),
+                'commands': commands,
+                'events': dict((name, dict(stats)) for name, stats in self._events.items()),
+            }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=4)
+
+    def _command_stats(self, command):
+        stats = self._commands.get(command)
+        if stats is None:
+            stats = self._commands[command] = {
+                'requests': 0,
+                'responses': 0,
+                'request_bytes': 0,
+                'response_bytes': 0,
+                'total_ms': 0.0,
+                'min_ms': None,
+                'max_ms': 0.0,
+                'histogram': [0] * (len(LATENCY_BUCKETS) + 1),
+            }
+        return stats
@@ -1,8 +1,11 @@
 
 from os.path import abspath, join, dirname, basename, split
-from threading import Timer
+from threading import Timer, Thread, Event, Lock
+from collections import deque
 from datetime import datetime
+import atexit
 import json
+import time
 import sys
 
 
@@ -13,26 +16,129 @@ else:  # Python 2
     from multiprocessing import Queue
 
 #  Debugging this adapter
-debug = True
 debug_no_maya = False
 log_file = abspath(join(dirname(__file__), 'log.txt'))
 
-if debug:
-    open(log_file, 'w+').close()  # Creates and/or clears the file
+# Per-command latencies and message sizes are written here when the session ends
+stats_file = abspath(join(dirname(__file__), 'stats.json'))
+
+# Log levels, the level used can be set with "log_level" in the launch configuration.
+# JSON payloads are only pretty-printed at the verbose level.
+ERROR, WARNING, INFO, DEBUG, VERBOSE = 40, 30, 20, 10, 5
+LOG_LEVELS = {'error': ERROR, 'warning': WARNING, 'info': INFO, 'debug': DEBUG, 'verbose': VERBOSE}
+
+log_level = INFO
+
+# Number of records kept waiting for the log thread before the oldest are dropped
+LOG_BUFFER_SIZE = 10000
 
 debugpy_path = join(abspath(dirname(__file__)), "python")
 
 
 # --- Utility functions --- #
 
-def log(msg, json_msg=None):
-    if debug:
+_log_records = deque(maxlen=LOG_BUFFER_SIZE)
+_log_lock = Lock()
+_log_ready = Event()
+_log_dropped = 0
+
+
+def set_log_level(level):
+    """
+    Sets the log level from its name in the launch configuration
+    """
+
+    global log_level
+
+    if level in LOG_LEVELS:
+        log_level = LOG_LEVELS[level]
+    elif level is not None:
+        log("Unknown log level: " + str(level), level=WARNING)
+
+
+def log(msg, json_msg=None, level=INFO):
+    """
+    Queues a message for the log thread. Nothing is formatted here,
+    so this is cheap to call from the threads forwarding messages.
+    """
+
+    global _log_dropped
+
+    if level < log_level:
+        return
+
+    with _log_lock:
+        if len(_log_records) == LOG_BUFFER_SIZE:
+            _log_dropped += 1
+        _log_records.append((time.time(), level, msg, json_msg))
+
+    _log_ready.set()
+
+
+def _format_log_record(record):
+    timestamp, level, msg, json_msg = record
+
+    if json_msg:
+        if isinstance(json_msg, bytes):
+            json_msg = json_msg.decode('UTF-8', 'replace')
+        if log_level <= VERBOSE:
+            json_msg = json.dumps(json.loads(json_msg), indent=4)
+        msg += '\n' + json_msg
+
+    return '\n' + datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") + " - " + msg + '\n'
 
-        if json_msg:
-            msg += '\n' + json.dumps(json.loads(json_msg), indent=4)
 
-        with open(log_file, 'a+') as f:
-            f.write('\n' + datetime.now().strftime("%Y-%m-%d %H:%M:%S") + " - " + msg + '\n')
+def _write_log_records(f):
+    global _log_dropped
+
+    while _log_records:
+        with _log_lock:
+            records = list(_log_records)
+            _log_records.clear()
+            dropped, _log_dropped = _log_dropped, 0
+
+        if dropped:
+            f.write('\n--- {} log messages dropped ---\n'.format(dropped))
+
+        for record in records:
+            try:
+                f.write(_format_log_record(record))
+            except Exception as e:
+                f.write('\nFailed to format log message: ' + str(e) + '\n')
+
+    f.flush()
+
+
+def _log_loop():
+    """
+    Writes queued log records to the log file, keeping it open,
+    until flush_log() asks it to stop
+    """
+
+    with open(log_file, 'w+') as f:  # Creates and/or clears the file
+        while True:
+            _log_ready.wait()
+            _log_ready.clear()
+            _write_log_records(f)
+            if _log_stopping.is_set():
+                return
+
+
+def flush_log(timeout=5):
+    """
+    Has the log thread write out whatever is still queued and waits for it,
+    used when the adapter exits. The log thread stays the only writer.
+    """
+
+    _log_stopping.set()
+    _log_ready.set()
+    _log_thread.join(timeout)
+
+
+_log_stopping = Event()
+_log_thread = Thread(target=_log_loop, name='log', daemon=True)
+_log_thread.start()
+atexit.register(flush_log)
 
 
 def run_in_new_thread(func, args=None, time=0.01):
@@ -40,26 +146,30 @@ def run_in_new_thread(func, args=None, time=0.01):
 
 
 # --- Resources --- #
-# Used once to ensure debugpy is imported to Maya
+# Used once to ensure debugpy is imported to Maya.
+# The address debugpy listens on is kept in sys so later sessions can find it.
 
 ATTACH_TEMPLATE = """
 import sys
 import os
-debugy_module = r"{debugy_path}"
-if debugy_module not in sys.path:
-    sys.path.insert(0, debugy_module)
+debugpy_module = r"{debugpy_path}"
+if debugpy_module not in sys.path:
+    sys.path.insert(0, debugpy_module)
 
 import debugpy
 
 try:
-    debugpy.configure(python="{interpreter}")
-    debugpy.listen(("{hostname}",{port}))
-except RuntimeError:
-    x=1
+    debugpy.configure(python={interpreter})
+    sys._sublime_debugpy_address = debugpy.listen(("{hostname}",{port}))
+except RuntimeError as e:
+    print("debugpy is already set up in Maya: " + str(e))
 finally:
     print("\\n\\nConnection to Sublime Debugger is active.\\n\\n")
 """
 
+# Returns "host:port" if debugpy was already set up in Maya by a previous session, "" otherwise
+DEBUGPY_ADDRESS_COMMAND = """python("':'.join(str(x) for x in getattr(__import__('sys'), '_sublime_debugpy_address', ()))")"""
+
 # Used to run the module
 RUN_TEMPLATE = """
 try:
@@ -80,6 +190,89 @@ except Exception as e:
     raise e
 """
 
+# Used to run the module, only reloading in place the modules under its
+# directory that changed since the last run, dependencies first
+RELOAD_TEMPLATE = """
+import os
+import sys
+
+def _sublime_module_stamps(directory):
+    # With a trailing separator, so modules in a sibling such as "foo_old" aren't included
+    directory = os.path.join(directory, '')
+    stamps = {{}}
+    for name, module in list(sys.modules.items()):
+        path = getattr(module, '__file__', None)
+        if not path:
+            continue
+        path = os.path.abspath(path)
+        if not path.startswith(directory):
+            continue
+        if path.endswith(('.pyc', '.pyo')):
+            path = path[:-1]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamps[name] = (stat.st_mtime, stat.st_size)
+    return stamps
+
+def _sublime_reload_order(names):
+    # A module depends on its submodules and on the modules it holds references to
+    modules = dict((name, sys.modules[name]) for name in names)
+    order = []
+    visiting = set()
+
+    def visit(name):
+        if name in visiting:
+            return
+        visiting.add(name)
+        values = list(vars(modules[name]).values())
+        for other, other_module in modules.items():
+            if other == name:
+                continue
+            if other.startswith(name + '.') or any(
+                value is other_module or getattr(value, '__module__', None) == other
+                for value in values
+            ):
+                visit(other)
+        order.append(name)
+
+    for name in sorted(names):
+        visit(name)
+    return order
+
+try:
+    current_directory = r"{dir}"
+    if current_directory not in sys.path:
+        sys.path.insert(0, current_directory)
+
+    print(' --- Debugging {file_name}... --- \\n')
+    if '{file_name}' not in globals().keys():
+        import {file_name}
+    else:
+        from _pydevd_bundle import pydevd_reload
+
+        _sublime_previous_stamps = globals().get('_sublime_stamps', {{}})
+        _sublime_changed = [
+            name for name, stamp in _sublime_module_stamps(os.path.abspath(current_directory)).items()
+            if name != '{file_name}' and _sublime_previous_stamps.get(name, stamp) != stamp
+        ]
+        for _sublime_name in _sublime_reload_order(_sublime_changed):
+            print(' --- Reloading ' + _sublime_name + ' --- \\n')
+            pydevd_reload.xreload(sys.modules[_sublime_name])
+
+        reload({file_name})
+
+    print(' --- Finished debugging {file_name} --- \\n')
+
+except Exception as e:
+    print('Error while debugging: ' + str(e))
+    raise e
+
+finally:
+    _sublime_stamps = _sublime_module_stamps(os.path.abspath(current_directory))
+"""
+
 CONTENT_HEADER = "Content-Length: "
 
 INITIALIZE_RESPONSE = """{
@@ -136,7 +329,38 @@ ATTACH_ARGS = """{{
     "MayaDebugFile": "{filepath}"
 }}"""
 
-EXEC_COMMAND = """python("execfile('{tmp_file_path}')")"""
+# Answers the custom "mayaStats" request with the adapter's message statistics
+STATS_RESPONSE = """{{
+    "request_seq": {request_seq},
+    "body": {body},
+    "seq": 0,
+    "success": true,
+    "command": "mayaStats",
+    "message": "",
+    "type": "response"
+}}"""
+
+OUTPUT_EVENT = """{{
+    "seq": 0,
+    "type": "event",
+    "event": "output",
+    "body": {{
+        "category": "console",
+        "output": {output}
+    }}
+}}"""
+
+# Runs base64 encoded code inline, in Maya's __main__ namespace
+INLINE_EXEC_COMMAND = """python("exec(compile(__import__('base64').b64decode('{code}'), '<sublime>', 'exec'), globals())")"""
+
+# Fallback for code too large to be sent inline. The file is closed once the code
+# ran, before Maya replies and the adapter deletes it (an open file can't be deleted
+# on Windows). tmp_file_path is a Python string literal, escaped for a MEL string.
+EXEC_COMMAND = """python("with open({tmp_file_path}) as _sublime_file:\\n    exec(compile(_sublime_file.read(), {tmp_file_path}, 'exec'), globals())")"""
+
+# Maya reads commands through a commandPort in chunks of this size by default,
+# larger commands are sent through a temporary file instead
+COMMAND_PORT_BUFFER_SIZE = 4096
 
 PAUSE_REQUEST = """{{
     "command": "pause",
@@ -42,6 +42,8 @@ config_snippets = [
                 "host": "localhost",
                 "port": 7002
             },
+            "log_level": "info",  # One of error, warning, info, debug or verbose
+            "reload": "top",  # "top" only reloads the program, "changed" also reloads edited modules next to it
         }
     },
 ]
@@ -52,6 +54,9 @@ settings = {
     "command": [sys.executable, adapter_path]
 }
 
+# Settings of this package, which decide how the adapter is run
+package_settings_file = adapter_type + ".sublime-settings"
+
 # Instantiate variables needed for checking thread
 running = False
 check_speed = 1  # number of seconds to wait between checks for adapter presence in debugger instances
@@ -77,9 +82,23 @@ def check_for_adapter():
                 adapter.snippets = config_snippets
 
 
-def plugin_loaded():
+def adapter_command():
+    """ Builds the command to run the adapter with from this package's settings """
+
+    command = [sys.executable, adapter_path]
+
+    if sublime.load_settings(package_settings_file).get("event_loop", False):
+        # Handle all of the adapter's I/O on a single thread
+        command.append("--event-loop")
+
+    return command
+
+
+def register_adapter():
     """ Add adapter to debugger settings for it to be recognized """
 
+    settings["command"] = adapter_command()
+
     # Add entry to debugger settings
     debugger_settings = sublime.load_settings('debugger.sublime-settings')
     adapters_custom = debugger_settings.get('adapters_custom', {})
@@ -89,6 +108,13 @@ def plugin_loaded():
     debugger_settings.set('adapters_custom', adapters_custom)
     sublime.save_settings('debugger.sublime-settings')
 
+
+def plugin_loaded():
+    """ Registers the adapter, and again whenever this package's settings change """
+
+    register_adapter()
+    sublime.load_settings(package_settings_file).add_on_change(adapter_type, register_adapter)
+
     # Start checking thread
     global running, timer
     running = True
@@ -103,6 +129,8 @@ def plugin_unloaded():
     running = False
     time.sleep(check_speed + .1)
 
+    sublime.load_settings(package_settings_file).clear_on_change(adapter_type)
+
     # Remove entry from debugger settings
     debugger_settings = sublime.load_settings('debugger.sublime-settings')
     adapters_custom = debugger_settings.get('adapters_custom', {})